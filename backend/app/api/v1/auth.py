@@ -15,6 +15,7 @@ from app.core.security import (
     get_current_active_user
 )
 from app.models import User
+from app.services.dashboard import invalidate_overview_cache
 from app.schemas import (
     UserRegister,
     UserResponse,
@@ -55,6 +56,7 @@ async def register(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    invalidate_overview_cache()
 
     # Create access token
     access_token = create_access_token(data={"sub": str(new_user.id)})
@@ -168,6 +170,8 @@ async def update_profile(
 
     db.commit()
     db.refresh(current_user)
+    # Cached overview rows carry the user's name
+    invalidate_overview_cache()
 
     return UserResponse.model_validate(current_user)
 
@@ -345,6 +345,7 @@ async def unlink_garmin(
     if connection:
         db.delete(connection)
         db.commit()
+    garmin_service.invalidate_garmin_client(current_user.id)
 
     return {"message": "Garmin account unlinked successfully"}
 
@@ -10,6 +10,7 @@ from app.core.database import get_db
 from app.core.security import get_current_active_user
 from app.models import User, HealthMetric
 from app.schemas import HealthMetricResponse, HealthMetricBase
+from app.services.dashboard import invalidate_overview_cache
 
 router = APIRouter(prefix="/health/metrics", tags=["Health"])
 
@@ -86,6 +87,7 @@ async def create_health_metric(
             setattr(existing, key, value)
         existing.updated_at = datetime.now(timezone.utc)
         db.commit()
+        invalidate_overview_cache()
         db.refresh(existing)
         return existing
 
@@ -96,6 +98,7 @@ async def create_health_metric(
     )
     db.add(new_metric)
     db.commit()
+    invalidate_overview_cache()
     db.refresh(new_metric)
 
     return new_metric
@@ -130,6 +133,7 @@ async def update_health_metric(
 
     metric.updated_at = datetime.now(timezone.utc)
     db.commit()
+    invalidate_overview_cache()
     db.refresh(metric)
 
     return metric
@@ -159,5 +163,6 @@ async def delete_health_metric(
 
     db.delete(metric)
     db.commit()
+    invalidate_overview_cache()
 
     return None
@@ -3,10 +3,13 @@ API endpoints for data ingestion (health metrics).
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from typing import List
 from app.core.database import get_db
 from app.core.security import verify_api_key
 from app.models import HealthMetric, User
-from app.schemas import HealthMetricCreate, HealthMetricResponse
+from app.schemas import HealthMetricBulkResponse, HealthMetricCreate, HealthMetricResponse
+from app.services.dashboard import invalidate_overview_cache
+from app.services.health_metrics import upsert_health_metrics
 
 router = APIRouter(prefix="/ingest", tags=["Data Ingestion"])
 
@@ -43,6 +46,7 @@ async def ingest_health_data(
             if value is not None:  # Only update non-null values
                 setattr(existing, key, value)
         db.commit()
+        invalidate_overview_cache()
         db.refresh(existing)
         return existing
     else:
@@ -50,5 +54,36 @@ async def ingest_health_data(
         health_metric = HealthMetric(**data.model_dump())
         db.add(health_metric)
         db.commit()
+        invalidate_overview_cache()
         db.refresh(health_metric)
         return health_metric
+
+
+@router.post("/health/bulk", response_model=HealthMetricBulkResponse)
+async def ingest_health_data_bulk(
+    data: List[HealthMetricCreate],
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Ingest many health metric records in one request.
+
+    Requires X-API-Key header for authentication.
+    Records for an existing user and date are updated, keeping stored values
+    where the incoming value is null. If a user and date appear more than
+    once, the last record wins.
+    """
+    user_ids = {item.user_id for item in data}
+    found = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))}
+    missing = sorted(user_ids - found)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {missing[0]} not found"
+        )
+
+    rows = {(item.user_id, item.date): item.model_dump() for item in data}
+    upsert_health_metrics(db, list(rows.values()))
+    db.commit()
+    invalidate_overview_cache()
+    return HealthMetricBulkResponse(count=len(rows))
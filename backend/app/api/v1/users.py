@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.core.security import verify_api_key, hash_password
 from app.models import User
 from app.schemas import UserCreate, UserResponse
+from app.services.dashboard import invalidate_overview_cache
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -57,6 +58,7 @@ async def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    invalidate_overview_cache()
     return new_user
 
 
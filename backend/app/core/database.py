@@ -1,17 +1,46 @@
 """
 Database connection and session management.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# Compiled SQL cache entries per engine (SQLAlchemy default: 500). Dashboard
+# statements are re-issued on every page load with only bind params changing.
+QUERY_CACHE_SIZE = 1200
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.database_path,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    connect_args={"check_same_thread": False},  # Needed for SQLite
+    query_cache_size=QUERY_CACHE_SIZE
+)
+
+# Applied to every new SQLite connection. WAL lets dashboard reads run while a
+# Garmin sync writes, and only needs fsync at checkpoints with synchronous=NORMAL.
+# cache_size is in KiB when negative (64 MB); mmap_size is in bytes (256 MB).
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each pooled SQLite connection as it is opened."""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
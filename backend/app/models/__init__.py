@@ -2,7 +2,7 @@
 SQLAlchemy database models for FamilyLifeHub.
 All timestamps are stored in UTC.
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Date, Text, Index
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Date, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.core.database import Base
@@ -111,6 +111,10 @@ class HealthMetric(Base):
     created_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
     updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc), nullable=False)
 
+    __table_args__ = (
+        Index('uq_health_user_date', 'user_id', 'date', unique=True),
+    )
+
     # Relationships
     user = relationship("User", back_populates="health_metrics")
 
@@ -132,8 +136,8 @@ class GarminConnection(Base):
     garmin_username = Column(Text, nullable=True)
     garmin_password = Column(Text, nullable=True)
     garmin_mfa_token = Column(Text, nullable=True)  # Deprecated: MFA tokens expire quickly, use OAuth tokens instead
-    garmin_oauth_tokens = Column(Text, nullable=True)  # Serialized OAuth1/OAuth2 tokens from garth (base64)
-    is_cn = Column(Integer, default=0, nullable=False)  # 0=International, 1=China
+    garmin_oauth_tokens = Column(Text, nullable=True)  # Serialized OAuth1/OAuth2 tokens from garth Client.dumps(), encrypted
+    is_cn = Column(Boolean, default=False, nullable=False)  # False=International, True=China
 
     # Garmin user info
     garmin_user_id = Column(String(255), nullable=True)
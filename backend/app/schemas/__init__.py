@@ -98,6 +98,11 @@ class HealthMetricCreate(HealthMetricBase):
     user_id: int = Field(..., description="User ID")
 
 
+class HealthMetricBulkResponse(BaseModel):
+    """Response schema for bulk health metric ingestion."""
+    count: int
+
+
 class HealthMetricResponse(HealthMetricBase):
     """Schema for health metric response."""
     id: int
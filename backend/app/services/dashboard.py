@@ -2,190 +2,222 @@
 Service layer for dashboard data aggregation and calculations.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from datetime import date, datetime, timedelta, timezone
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
 from app.models import User, HealthMetric, UserPreference
 from app.schemas import (
     DailyTrendData, OverviewMetric, UserPreferenceResponse, UserPreferenceUpdate,
     SummaryResponse, SummaryMetric
 )
 
+# HealthMetric columns exposed on overview and trend rows
+_METRIC_FIELDS = (
+    'sleep_hours', 'light_sleep_hours', 'deep_sleep_hours', 'rem_sleep_hours',
+    'exercise_minutes', 'stress_level', 'steps', 'calories', 'distance_km',
+    'body_battery', 'spo2', 'respiration_rate', 'resting_hr', 'sleep_score',
+    'hrv_last_night', 'hrv_weekly_avg', 'hrv_status',
+)
 
-def get_user_daily_trends(
+# Rows fetched per round-trip for trend ranges. Only each row's field values
+# are kept, so ORM objects for a long range aren't all held at once.
+_TREND_FETCH_BATCH = 1000
+
+# Short-lived cache for the family-wide overview, which every dashboard load
+# requests with identical results. Keyed by (target_date, version); bumping the
+# version via invalidate_overview_cache() discards all entries at once. The
+# public overview endpoint accepts any target_date, so at most
+# _OVERVIEW_CACHE_MAXSIZE dates are kept, least recently used evicted first.
+_OVERVIEW_CACHE_TTL_SECONDS = 30
+_OVERVIEW_CACHE_MAXSIZE = 32
+_overview_cache: 'OrderedDict[Tuple[date, int], Tuple[float, List[OverviewMetric]]]' = OrderedDict()
+_overview_cache_version = 0
+# Invalidation runs from sync threads and threadpool endpoints while the async
+# overview endpoint reads the cache on the event loop
+_overview_cache_lock = threading.Lock()
+
+
+def invalidate_overview_cache() -> None:
+    """Drop cached overview data. Call after health metrics or users change."""
+    global _overview_cache_version
+    with _overview_cache_lock:
+        _overview_cache_version += 1
+        _overview_cache.clear()
+
+
+def _metric_values(health: Optional[HealthMetric]) -> Dict[str, object]:
+    """Extract dashboard metric fields from a HealthMetric row (all None if missing)."""
+    if health is None:
+        return dict.fromkeys(_METRIC_FIELDS)
+    return {field: getattr(health, field) for field in _METRIC_FIELDS}
+
+
+def _load_users(db: Session, user_id: Optional[int] = None) -> List[User]:
+    """Load all users, or only the given user when user_id is set."""
+    stmt = select(User).order_by(User.id)
+    if user_id is not None:
+        stmt = stmt.where(User.id == user_id)
+    return list(db.scalars(stmt))
+
+
+def _health_stmt(start_date: date, end_date: date, user_id: Optional[int] = None):
+    """Build the health metric select for [start_date, end_date], optionally for one user."""
+    stmt = select(HealthMetric).where(
+        HealthMetric.date >= start_date,
+        HealthMetric.date <= end_date
+    )
+    if user_id is not None:
+        stmt = stmt.where(HealthMetric.user_id == user_id)
+    return stmt
+
+
+def _load_health(
     db: Session,
-    user_id: int,
     start_date: date,
-    end_date: date
+    end_date: date,
+    user_id: Optional[int] = None
+) -> Dict[Tuple[int, date], HealthMetric]:
+    """Fetch health metrics in [start_date, end_date] keyed by (user_id, date)."""
+    return {
+        (h.user_id, h.date): h
+        for h in db.scalars(_health_stmt(start_date, end_date, user_id))
+    }
+
+
+def _trends(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    user_id: Optional[int] = None
 ) -> List[DailyTrendData]:
     """
-    Calculate daily aggregated trends for a specific user within date range.
+    Build daily trend rows for all users, or a single user when user_id is set.
+
+    Health metrics are streamed with yield_per and reduced to their dashboard
+    fields, so ORM rows for long ranges are not all held at once.
 
     Args:
         db: Database session
-        user_id: User ID to filter by
         start_date: Start date (inclusive)
         end_date: End date (inclusive)
+        user_id: Optional user ID to filter by
 
     Returns:
-        List of DailyTrendData objects
+        List of DailyTrendData objects ordered by date, then user
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    users = _load_users(db, user_id)
+    if not users:
         return []
 
+    stmt = _health_stmt(start_date, end_date, user_id).execution_options(yield_per=_TREND_FETCH_BATCH)
+    values_by_key = {(h.user_id, h.date): _metric_values(h) for h in db.scalars(stmt)}
+    empty = _metric_values(None)
+
     trends = []
     current_date = start_date
-
     while current_date <= end_date:
-        # Get health metrics for this user and date
-        health = db.query(HealthMetric).filter(
-            HealthMetric.user_id == user_id,
-            HealthMetric.date == current_date
-        ).first()
-
-        # Create trend data point
-        trend = DailyTrendData(
-            date=current_date,
-            user_id=user.id,
-            user_name=user.name,
-            sleep_hours=health.sleep_hours if health else None,
-            light_sleep_hours=health.light_sleep_hours if health else None,
-            deep_sleep_hours=health.deep_sleep_hours if health else None,
-            rem_sleep_hours=health.rem_sleep_hours if health else None,
-            exercise_minutes=health.exercise_minutes if health else None,
-            stress_level=health.stress_level if health else None,
-            steps=health.steps if health else None,
-            calories=health.calories if health else None,
-            distance_km=health.distance_km if health else None,
-            body_battery=health.body_battery if health else None,
-            spo2=health.spo2 if health else None,
-            respiration_rate=health.respiration_rate if health else None,
-            resting_hr=health.resting_hr if health else None,
-            sleep_score=health.sleep_score if health else None,
-            hrv_last_night=health.hrv_last_night if health else None,
-            hrv_weekly_avg=health.hrv_weekly_avg if health else None,
-            hrv_status=health.hrv_status if health else None
-        )
-        trends.append(trend)
-
+        for user in users:
+            trends.append(DailyTrendData(
+                date=current_date,
+                user_id=user.id,
+                user_name=user.name,
+                **values_by_key.get((user.id, current_date), empty)
+            ))
         current_date += timedelta(days=1)
-
     return trends
 
 
-def get_user_overview(db: Session, user_id: int, target_date: date = None) -> List[OverviewMetric]:
+def _overview(
+    db: Session,
+    target_date: Optional[date] = None,
+    user_id: Optional[int] = None
+) -> List[OverviewMetric]:
     """
-    Get overview metrics for a specific user.
+    Build overview rows for all users, or a single user when user_id is set.
 
     Args:
         db: Database session
-        user_id: User ID to filter by
         target_date: Target date (defaults to today)
+        user_id: Optional user ID to filter by
 
     Returns:
-        List of OverviewMetric objects (will contain at most one item)
+        List of OverviewMetric objects
     """
     if target_date is None:
         target_date = date.today()
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    users = _load_users(db, user_id)
+    if not users:
         return []
 
-    overview = []
-
-    # Get health metrics
-    health = db.query(HealthMetric).filter(
-        HealthMetric.user_id == user_id,
-        HealthMetric.date == target_date
-    ).first()
-
-    metric = OverviewMetric(
-        user_id=user.id,
-        user_name=user.name,
-        sleep_hours=health.sleep_hours if health else None,
-        light_sleep_hours=health.light_sleep_hours if health else None,
-        deep_sleep_hours=health.deep_sleep_hours if health else None,
-        rem_sleep_hours=health.rem_sleep_hours if health else None,
-        exercise_minutes=health.exercise_minutes if health else None,
-        stress_level=health.stress_level if health else None,
-        steps=health.steps if health else None,
-        calories=health.calories if health else None,
-        distance_km=health.distance_km if health else None,
-        body_battery=health.body_battery if health else None,
-        spo2=health.spo2 if health else None,
-        respiration_rate=health.respiration_rate if health else None,
-        resting_hr=health.resting_hr if health else None,
-        sleep_score=health.sleep_score if health else None,
-        hrv_last_night=health.hrv_last_night if health else None,
-        hrv_weekly_avg=health.hrv_weekly_avg if health else None,
-        hrv_status=health.hrv_status if health else None
-    )
-    overview.append(metric)
+    health_by_key = _load_health(db, target_date, target_date, user_id)
 
-    return overview
+    return [
+        OverviewMetric(
+            user_id=user.id,
+            user_name=user.name,
+            **_metric_values(health_by_key.get((user.id, target_date)))
+        )
+        for user in users
+    ]
 
 
-def get_daily_trends(
+def get_user_daily_trends(
     db: Session,
+    user_id: int,
     start_date: date,
     end_date: date
 ) -> List[DailyTrendData]:
     """
-    Calculate daily aggregated trends for all users within date range.
+    Calculate daily aggregated trends for a specific user within date range.
 
     Args:
         db: Database session
+        user_id: User ID to filter by
         start_date: Start date (inclusive)
         end_date: End date (inclusive)
 
     Returns:
         List of DailyTrendData objects
     """
-    trends = []
+    return _trends(db, start_date, end_date, user_id=user_id)
 
-    # Get all users
-    users = db.query(User).all()
 
-    # Iterate through each date in range
-    current_date = start_date
-    while current_date <= end_date:
-        for user in users:
-            # Get health metrics for this user and date
-            health = db.query(HealthMetric).filter(
-                HealthMetric.user_id == user.id,
-                HealthMetric.date == current_date
-            ).first()
-
-            # Create trend data point
-            trend = DailyTrendData(
-                date=current_date,
-                user_id=user.id,
-                user_name=user.name,
-                sleep_hours=health.sleep_hours if health else None,
-                light_sleep_hours=health.light_sleep_hours if health else None,
-                deep_sleep_hours=health.deep_sleep_hours if health else None,
-                rem_sleep_hours=health.rem_sleep_hours if health else None,
-                exercise_minutes=health.exercise_minutes if health else None,
-                stress_level=health.stress_level if health else None,
-                steps=health.steps if health else None,
-                calories=health.calories if health else None,
-                distance_km=health.distance_km if health else None,
-                body_battery=health.body_battery if health else None,
-                spo2=health.spo2 if health else None,
-                respiration_rate=health.respiration_rate if health else None,
-                resting_hr=health.resting_hr if health else None,
-                sleep_score=health.sleep_score if health else None,
-                hrv_last_night=health.hrv_last_night if health else None,
-                hrv_weekly_avg=health.hrv_weekly_avg if health else None,
-                hrv_status=health.hrv_status if health else None
-            )
-            trends.append(trend)
+def get_user_overview(db: Session, user_id: int, target_date: date = None) -> List[OverviewMetric]:
+    """
+    Get overview metrics for a specific user.
 
-        current_date += timedelta(days=1)
+    Args:
+        db: Database session
+        user_id: User ID to filter by
+        target_date: Target date (defaults to today)
 
-    return trends
+    Returns:
+        List of OverviewMetric objects (will contain at most one item)
+    """
+    return _overview(db, target_date, user_id=user_id)
+
+
+def get_daily_trends(
+    db: Session,
+    start_date: date,
+    end_date: date
+) -> List[DailyTrendData]:
+    """
+    Calculate daily aggregated trends for all users within date range.
+
+    Args:
+        db: Database session
+        start_date: Start date (inclusive)
+        end_date: End date (inclusive)
+
+    Returns:
+        List of DailyTrendData objects
+    """
+    return _trends(db, start_date, end_date)
 
 
 def get_today_overview(db: Session, target_date: date = None) -> List[OverviewMetric]:
@@ -202,40 +234,24 @@ def get_today_overview(db: Session, target_date: date = None) -> List[OverviewMe
     if target_date is None:
         target_date = date.today()
 
-    overview = []
-    users = db.query(User).all()
+    now = time.monotonic()
+    with _overview_cache_lock:
+        key = (target_date, _overview_cache_version)
+        cached = _overview_cache.get(key)
+        if cached and now - cached[0] < _OVERVIEW_CACHE_TTL_SECONDS:
+            _overview_cache.move_to_end(key)
+            return list(cached[1])
 
-    for user in users:
-        # Get health metrics
-        health = db.query(HealthMetric).filter(
-            HealthMetric.user_id == user.id,
-            HealthMetric.date == target_date
-        ).first()
+    overview = _overview(db, target_date)
 
-        metric = OverviewMetric(
-            user_id=user.id,
-            user_name=user.name,
-            sleep_hours=health.sleep_hours if health else None,
-            light_sleep_hours=health.light_sleep_hours if health else None,
-            deep_sleep_hours=health.deep_sleep_hours if health else None,
-            rem_sleep_hours=health.rem_sleep_hours if health else None,
-            exercise_minutes=health.exercise_minutes if health else None,
-            stress_level=health.stress_level if health else None,
-            steps=health.steps if health else None,
-            calories=health.calories if health else None,
-            distance_km=health.distance_km if health else None,
-            body_battery=health.body_battery if health else None,
-            spo2=health.spo2 if health else None,
-            respiration_rate=health.respiration_rate if health else None,
-            resting_hr=health.resting_hr if health else None,
-            sleep_score=health.sleep_score if health else None,
-            hrv_last_night=health.hrv_last_night if health else None,
-            hrv_weekly_avg=health.hrv_weekly_avg if health else None,
-            hrv_status=health.hrv_status if health else None
-        )
-        overview.append(metric)
-
-    return overview
+    with _overview_cache_lock:
+        # Skip the insert if the cache was invalidated while querying
+        if key[1] == _overview_cache_version:
+            _overview_cache[key] = (now, overview)
+            _overview_cache.move_to_end(key)
+            while len(_overview_cache) > _OVERVIEW_CACHE_MAXSIZE:
+                _overview_cache.popitem(last=False)
+    return list(overview)
 
 
 def get_user_summary(db: Session, user_id: int, target_date: date = None) -> dict:
@@ -257,14 +273,16 @@ def get_user_summary(db: Session, user_id: int, target_date: date = None) -> dic
         target_date = date.today()
 
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.scalars(select(User).where(User.id == user_id)).first()
     if not user:
         raise ValueError(f"User {user_id} not found")
 
     # Get health metric for target date
-    health_metric = db.query(HealthMetric).filter(
-        HealthMetric.user_id == user_id,
-        HealthMetric.date == target_date
+    health_metric = db.scalars(
+        select(HealthMetric).where(
+            HealthMetric.user_id == user_id,
+            HealthMetric.date == target_date
+        )
     ).first()
 
     summary = {
@@ -274,8 +292,8 @@ def get_user_summary(db: Session, user_id: int, target_date: date = None) -> dic
         'avatar': user.avatar,
         'metrics': {
             'sleep_hours': health_metric.sleep_hours if health_metric else None,
-            'steps': getattr(health_metric, 'steps', None) if health_metric else None,
-            'calories': getattr(health_metric, 'calories', None) if health_metric else None,
+            'steps': health_metric.steps if health_metric else None,
+            'calories': health_metric.calories if health_metric else None,
             'stress_level': health_metric.stress_level if health_metric else None,
         }
     }
@@ -296,8 +314,8 @@ def get_user_preferences(db: Session, user_id: int) -> UserPreferenceResponse:
     Returns:
         UserPreferenceResponse object
     """
-    preference = db.query(UserPreference).filter(
-        UserPreference.user_id == user_id
+    preference = db.scalars(
+        select(UserPreference).where(UserPreference.user_id == user_id)
     ).first()
 
     if preference:
@@ -341,8 +359,8 @@ def update_user_preferences(db: Session, user_id: int, preferences: UserPreferen
     Returns:
         UserPreferenceResponse object
     """
-    existing = db.query(UserPreference).filter(
-        UserPreference.user_id == user_id
+    existing = db.scalars(
+        select(UserPreference).where(UserPreference.user_id == user_id)
     ).first()
 
     if existing:
@@ -1,22 +1,29 @@
 # ABOUTME: Garmin Connect service for OAuth authentication and health data sync
 # ABOUTME: Handles username/password login, MFA flow, token persistence, and data ingestion
-import garth
-from garth.http import Client
-from garth.sso import login as garth_login, resume_login
-from garth.exc import GarthHTTPError, GarthException
-from garth.stats import DailySteps, DailyIntensityMinutes, DailyHRV, DailyStress
-from garth import DailyBodyBatteryStress
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta, date, timezone
-from typing import Dict, List, Optional, Any, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Any, Tuple
+import functools
 import logging
 import secrets
+import threading
+import time
+import weakref
 import base64
-import pickle
-import traceback
+import re
 
 from app.core.security import encrypt_token, decrypt_token
 from app.models import User, GarminConnection, HealthMetric, GarminActivity, BodyStatusTimeseries
 from app.core.database import SessionLocal
+from app.services.dashboard import invalidate_overview_cache
+from app.services.health_metrics import HEALTH_METRIC_FIELDS, dialect_insert, upsert_health_metrics
+
+# garth pulls in a large dependency tree, so it is imported inside the
+# functions that use it rather than on every worker startup
+if TYPE_CHECKING:
+    from garth.http import Client
 
 logger = logging.getLogger(__name__)
 
@@ -25,26 +32,34 @@ logger = logging.getLogger(__name__)
 # LIMITATION: In-memory storage means MFA sessions are lost on server restart.
 # Users in the middle of MFA verification will need to restart the flow.
 # For production, consider using Redis or another persistent cache.
-_mfa_sessions: Dict[str, Dict[str, Any]] = {}
+# Kept in creation order so expired sessions are always at the front.
+_mfa_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# Guards _mfa_sessions; sync endpoints run in FastAPI's threadpool. Reentrant
+# so store/get can hold it across their own cleanup call.
+_mfa_sessions_lock = threading.RLock()
 
 # Session timeout for MFA (10 minutes)
 _MFA_SESSION_TIMEOUT = timedelta(minutes=10)
 
 
 def cleanup_expired_mfa_sessions():
-    """Remove expired MFA sessions from the in-memory store."""
+    """
+    Remove expired MFA sessions from the in-memory store.
+
+    Sessions are stored oldest first, so the sweep stops at the first one
+    that is still live instead of scanning every session.
+    """
     now = datetime.now(timezone.utc)
-    expired_sessions = [
-        session_id
-        for session_id, session_data in _mfa_sessions.items()
-        if now - session_data.get("created_at", now) > _MFA_SESSION_TIMEOUT
-    ]
-    for session_id in expired_sessions:
-        del _mfa_sessions[session_id]
-        logger.debug(f"Cleaned up expired MFA session: {session_id}")
+    with _mfa_sessions_lock:
+        while _mfa_sessions:
+            session_id, session_data = next(iter(_mfa_sessions.items()))
+            if now - session_data["created_at"] <= _MFA_SESSION_TIMEOUT:
+                break
+            _mfa_sessions.popitem(last=False)
+            logger.debug("Cleaned up expired MFA session: %s", session_id)
 
 
-def store_mfa_session(client: Client, signin_params: dict, is_cn: bool = False, username: str = "", password: str = "") -> str:
+def store_mfa_session(client: "Client", signin_params: dict, is_cn: bool = False, username: str = "", password: str = "") -> str:
     """
     Store Client object and signin params for MFA resume.
 
@@ -58,18 +73,19 @@ def store_mfa_session(client: Client, signin_params: dict, is_cn: bool = False,
     Returns:
         Session ID for retrieving this session later
     """
-    cleanup_expired_mfa_sessions()
-
     session_id = secrets.token_urlsafe(32)
-    _mfa_sessions[session_id] = {
-        "client": client,
-        "signin_params": signin_params,
-        "is_cn": is_cn,
-        "username": username,
-        "password": password,
-        "created_at": datetime.now(timezone.utc)
-    }
-    logger.info(f"Stored MFA session: {session_id[:16]}...")
+    with _mfa_sessions_lock:
+        cleanup_expired_mfa_sessions()
+        # Stamped under the lock so sessions stay in creation order
+        _mfa_sessions[session_id] = {
+            "client": client,
+            "signin_params": signin_params,
+            "is_cn": is_cn,
+            "username": username,
+            "password": password,
+            "created_at": datetime.now(timezone.utc)
+        }
+    logger.info("Stored MFA session: %s...", session_id[:16])
     return session_id
 
 
@@ -83,22 +99,23 @@ def get_mfa_session(session_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dict with "client" and "signin_params", or None if session expired/not found
     """
-    cleanup_expired_mfa_sessions()
-
-    session_data = _mfa_sessions.get(session_id)
+    with _mfa_sessions_lock:
+        cleanup_expired_mfa_sessions()
+        session_data = _mfa_sessions.get(session_id)
     if not session_data:
-        logger.warning(f"MFA session not found or expired: {session_id[:16] if session_id else 'empty'}...")
+        logger.warning("MFA session not found or expired: %s...", session_id[:16] if session_id else 'empty')
         return None
 
-    logger.info(f"Retrieved MFA session: {session_id[:16]}...")
+    logger.info("Retrieved MFA session: %s...", session_id[:16])
     return session_data
 
 
 def delete_mfa_session(session_id: str):
     """Remove an MFA session from storage."""
-    if session_id in _mfa_sessions:
-        del _mfa_sessions[session_id]
-        logger.debug(f"Deleted MFA session: {session_id[:16]}...")
+    with _mfa_sessions_lock:
+        removed = _mfa_sessions.pop(session_id, None)
+    if removed is not None:
+        logger.debug("Deleted MFA session: %s...", session_id[:16])
 
 
 class GarminServiceError(Exception):
@@ -116,15 +133,137 @@ class GarminAPIError(GarminServiceError):
     pass
 
 
-def serialize_oauth_tokens(client: Client) -> str:
+# Signin params for resuming an MFA login that garth did not hand back, by is_cn.
+# Treated as read-only; garth only sends them as request params.
+_SIGNIN_PARAMS: Dict[bool, Dict[str, str]] = {
+    is_cn: {
+        "id": "gauth-widget",
+        "embedWidget": "true",
+        "gauthHost": f"https://sso.{'garmin.cn' if is_cn else 'garmin.com'}/sso",
+    }
+    for is_cn in (True, False)
+}
+
+# Login error classification, checked in this order against the error message
+# Our own MFA errors that must propagate unchanged
+_MFA_ERROR_RE = re.compile(r"MFA session storage failed|MFA verification failed|MFA session expired", re.IGNORECASE)
+# Garmin asking for a second factor without a resumable session
+_MFA_REQUIRED_RE = re.compile(r"2FA|OTP|authenticator|verification code|verify your identity|ticket|mfa", re.IGNORECASE)
+_UNAUTHORIZED_RE = re.compile(r"401|Unauthorized")
+
+# resume_login failures
+_MFA_CODE_EXPIRED_RE = re.compile(r"ticket", re.IGNORECASE)
+_MFA_CODE_INVALID_RE = re.compile(r"invalid|incorrect", re.IGNORECASE)
+
+
+def _mfa_verification_error(error_msg: str) -> GarminAuthError:
+    """Map a resume_login failure message to a user-facing GarminAuthError."""
+    if _MFA_CODE_EXPIRED_RE.search(error_msg):
+        return GarminAuthError(
+            "MFA verification failed. The code may have expired. "
+            "Please request a new verification code and try again."
+        )
+    if _MFA_CODE_INVALID_RE.search(error_msg):
+        return GarminAuthError(
+            "Invalid verification code. Please check the code and try again."
+        )
+    return GarminAuthError(f"MFA verification failed: {error_msg}")
+
+
+# Serialized token cache per client: client -> (oauth1_token, oauth2_token, serialized).
+# Reused while the client still holds the same token objects, so saving the
+# connection after a sync doesn't re-run dumps() for unchanged tokens.
+_serialized_tokens: "weakref.WeakKeyDictionary[Client, Tuple[Any, Any, str]]" = weakref.WeakKeyDictionary()
+
+
+# Authenticated clients kept between syncs: user_id -> (client, expires_at).
+# Reusing a client skips the token verification round-trip and keeps the
+# underlying HTTP session (and its TLS connections) alive.
+_client_cache: Dict[int, Tuple["Client", float]] = {}
+
+# How long a cached client is reused before tokens are re-verified
+_CLIENT_CACHE_TTL_SECONDS = 600
+
+
+# Also retry when Garmin rate-limits the concurrent per-day fetches
+_RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def _new_client(is_cn: bool = False) -> "Client":
+    """Create a garth Client for the given region."""
+    from garth.http import Client
+
+    client = Client()
+    # Size the keep-alive pool so every fetch worker can hold a connection
+    client.configure(
+        domain="garmin.cn" if is_cn else None,
+        pool_connections=_FETCH_WORKERS,
+        pool_maxsize=_FETCH_WORKERS,
+        status_forcelist=_RETRY_STATUSES,
+    )
+    return client
+
+
+def _get_cached_client(user_id: int) -> Optional["Client"]:
+    """Return the cached client for a user if it hasn't expired."""
+    entry = _client_cache.get(user_id)
+    if entry is None:
+        return None
+    client, expires_at = entry
+    if time.monotonic() >= expires_at:
+        _client_cache.pop(user_id, None)
+        return None
+    return client
+
+
+def _cache_client(user_id: int, client: "Client") -> None:
+    """Cache an authenticated client for reuse by later syncs."""
+    _client_cache[user_id] = (client, time.monotonic() + _CLIENT_CACHE_TTL_SECONDS)
+
+
+def invalidate_garmin_client(user_id: int) -> None:
+    """Drop a user's cached client, e.g. after credentials change or auth fails."""
+    _client_cache.pop(user_id, None)
+    _decrypt_oauth_tokens.cache_clear()
+
+
+@functools.lru_cache(maxsize=32)
+def _decrypt_oauth_tokens(encrypted: str) -> str:
     """
-    Serialize the garth client's OAuth tokens to a base64 encoded string.
+    Decrypt a stored OAuth token blob, memoized per ciphertext.
+
+    Only the token blob is cached, never usernames or passwords, and the cache
+    is cleared by invalidate_garmin_client() whenever credentials change.
+
+    Args:
+        encrypted: garmin_oauth_tokens column value
+
+    Returns:
+        Serialized token string
+
+    Raises:
+        ValueError: If the blob can't be decrypted (raised so it isn't cached)
+    """
+    token_str = decrypt_token(encrypted)
+    if token_str is None:
+        raise ValueError("Stored OAuth tokens could not be decrypted")
+    return token_str
+
+
+def _decode_legacy_tokens(token_str: str) -> str:
+    """Strip the extra base64 layer from tokens stored before it was dropped."""
+    return base64.b64decode(token_str.encode('utf-8')).decode('utf-8')
+
+
+def serialize_oauth_tokens(client: "Client") -> str:
+    """
+    Serialize the garth client's OAuth tokens using garth's own dumps() format.
 
     Args:
         client: Authenticated garth Client instance
 
     Returns:
-        Base64 encoded string containing the serialized tokens, or empty string on failure
+        Serialized token string (garth's base64 JSON), or empty string on failure
     """
     try:
         if not client.oauth1_token:
@@ -134,36 +273,47 @@ def serialize_oauth_tokens(client: Client) -> str:
             logger.warning("No OAuth2 token found on client!")
             return ""
 
+        cached = _serialized_tokens.get(client)
+        if cached and cached[0] is client.oauth1_token and cached[1] is client.oauth2_token:
+            return cached[2]
+
         token_data = client.dumps()
-        logger.info(f"Serialized OAuth tokens: {len(token_data)} chars")
-        return base64.b64encode(token_data.encode('utf-8')).decode('utf-8')
+        logger.info("Serialized OAuth tokens: %s chars", len(token_data))
+        _serialized_tokens[client] = (client.oauth1_token, client.oauth2_token, token_data)
+        return token_data
 
     except Exception as e:
-        logger.error(f"Failed to serialize OAuth tokens: {e}")
-        logger.debug(f"Full traceback:", exc_info=True)
+        logger.error("Failed to serialize OAuth tokens: %s", e)
+        logger.debug("Full traceback:", exc_info=True)
         return ""
 
 
-def deserialize_oauth_tokens(token_str: str, client: Client) -> bool:
+def deserialize_oauth_tokens(token_str: str, client: "Client") -> bool:
     """
-    Deserialize OAuth tokens from a base64 encoded string and load into client.
+    Load serialized OAuth tokens into a client.
+
+    Accepts both the current format (garth dumps() output) and the legacy
+    format, which wrapped dumps() output in an additional base64 layer.
 
     Args:
-        token_str: Base64 encoded string containing serialized tokens
+        token_str: Serialized tokens from serialize_oauth_tokens
         client: The garth Client to load tokens into
 
     Returns:
         True if tokens were successfully loaded, False otherwise
     """
     try:
-        token_data = base64.b64decode(token_str.encode('utf-8')).decode('utf-8')
-        client.loads(token_data)
+        try:
+            client.loads(token_str)
+        except ValueError:
+            client.loads(_decode_legacy_tokens(token_str))
+            logger.debug("Loaded OAuth tokens from legacy double-base64 format")
         logger.debug("Successfully deserialized OAuth tokens")
         return True
 
     except Exception as e:
-        logger.warning(f"Failed to deserialize OAuth tokens: {e}")
-        logger.debug(f"Full traceback:", exc_info=True)
+        logger.warning("Failed to deserialize OAuth tokens: %s", e)
+        logger.debug("Full traceback:", exc_info=True)
         return False
 
 
@@ -172,8 +322,9 @@ def login(
     password: str,
     mfa_token: Optional[str] = None,
     is_cn: bool = False,
-    mfa_session_id: Optional[str] = None
-) -> Tuple[Client, dict]:
+    mfa_session_id: Optional[str] = None,
+    fetch_profile: bool = True
+) -> Tuple["Client", dict]:
     """
     Login to Garmin Connect using garth library.
 
@@ -183,6 +334,8 @@ def login(
         mfa_token: Optional MFA token if Garmin requires 2FA
         is_cn: True for China (garmin.cn), False for International (garmin.com)
         mfa_session_id: Optional MFA session ID from previous MFA detection
+        fetch_profile: Fetch the Garmin user ID and display name after login.
+            Skipping it saves a request when only the tokens are needed.
 
     Returns:
         Tuple of (authenticated Client, user_info dict)
@@ -198,14 +351,16 @@ def login(
        - Retrieves Client from server-side session storage
        - Calls resume_login with the same Client object
     """
+    from garth.exc import GarthException
+    from garth.sso import login as garth_login, resume_login
     region = "Garmin China" if is_cn else "Garmin International"
-    logger.info(f"Attempting {region} login for user: {username[:3]}***")
+    logger.info("Attempting %s login for user: %s***", region, username[:3])
 
     client = None
 
     # If MFA token is provided with session_id, complete the login
     if mfa_token and mfa_session_id:
-        logger.info(f"Completing {region} MFA login with session: {mfa_session_id[:16]}...")
+        logger.info("Completing %s MFA login with session: %s...", region, mfa_session_id[:16])
 
         # Retrieve the stored session with Client object
         session_data = get_mfa_session(mfa_session_id)
@@ -226,13 +381,13 @@ def login(
                 "signin_params": signin_params
             }
 
-            logger.info(f"Calling resume_login with MFA code...")
+            logger.info("Calling resume_login with MFA code...")
             oauth1, oauth2 = resume_login(client_state, mfa_token)
 
             # Set tokens to our client
             client.oauth1_token = oauth1
             client.oauth2_token = oauth2
-            logger.info(f"Successfully authenticated with {region} using MFA")
+            logger.info("Successfully authenticated with %s using MFA", region)
 
             # Clean up the session after successful login
             delete_mfa_session(mfa_session_id)
@@ -242,54 +397,37 @@ def login(
             logger.info("MFA completed successfully, proceeding to fetch user profile")
 
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"MFA login failed: {e}")
-
-            if "ticket" in error_msg.lower():
-                raise GarminAuthError(
-                    "MFA verification failed. The code may have expired. "
-                    "Please request a new verification code and try again."
-                )
-            if "invalid" in error_msg.lower() or "incorrect" in error_msg.lower():
-                raise GarminAuthError(
-                    "Invalid verification code. Please check the code and try again."
-                )
-            raise GarminAuthError(f"MFA verification failed: {error_msg}")
+            logger.error("MFA login failed: %s", e)
+            raise _mfa_verification_error(str(e))
 
     # Initial login attempt - only runs when NOT completing MFA
     # This prevents creating a new Client and triggering a second login during MFA flow
     if client is None:
-        logger.info(f"Attempting {region} login (with return_on_mfa=True)")
+        logger.info("Attempting %s login (with return_on_mfa=True)", region)
 
         # Create and configure client
-        client = Client()
-        if is_cn:
-            client.configure(domain="garmin.cn")
+        client = _new_client(is_cn)
 
         try:
-            logger.info(f"Calling garth_login with username={username[:3]}***, return_on_mfa=True")
+            logger.info("Calling garth_login with username=%s***, return_on_mfa=True", username[:3])
             result = garth_login(username, password, client=client, return_on_mfa=True)
 
         except GarthException as e:
             # garth throws "Unexpected title" when it encounters MFA pages
             # that don't have "MFA" in the title (e.g., "GARMIN Authentication Application")
             error_msg = str(e)
-            logger.info(f"GarthException caught: {error_msg[:100]}")
+            logger.info("GarthException caught: %s", error_msg[:100])
             if "Unexpected title" in error_msg:
                 title = error_msg.replace("Unexpected title: ", "").strip()
-                logger.info(f"Unexpected title detected: {title}")
+                logger.info("Unexpected title detected: %s", title)
                 # Check if this is an MFA/Authentication page
                 if "authentication" in title.lower() or "mfa" in title.lower():
-                    logger.info(f"MFA detected via Unexpected title: {title}")
+                    logger.info("MFA detected via Unexpected title: %s", title)
                     # Store the client session for MFA resume
                     # We need to create signin_params manually since garth didn't return them
-                    signin_params = {
-                        "id": "gauth-widget",
-                        "embedWidget": "true",
-                        "gauthHost": f"https://sso.{'garmin.cn' if is_cn else 'garmin.com'}/sso",
-                    }
+                    signin_params = _SIGNIN_PARAMS[bool(is_cn)]
                     session_id = store_mfa_session(client, signin_params, is_cn, username, password)
-                    logger.info(f"MFA session created: {session_id[:16]}...")
+                    logger.info("MFA session created: %s...", session_id[:16])
                     # Raise this OUTSIDE the try-except so it doesn't get caught
                     raise GarminAuthError(f"MFA_REQUIRED:{session_id}")
             # Not an MFA-related Unexpected title, re-raise
@@ -297,10 +435,8 @@ def login(
         except Exception as e:
             # Other exceptions from garth_login
             error_msg = str(e)
-            logger.error(f"{region} login failed: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error message details: {error_msg}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error("%s login failed: %s (%s)", region, e, type(e).__name__)
+            logger.debug("Full traceback:", exc_info=True)
 
             # Check if this is our MFA_REQUIRED error with session_id - MUST BE FIRST!
             if error_msg.startswith("MFA_REQUIRED:"):
@@ -308,35 +444,25 @@ def login(
                 raise
 
             # Check for other MFA-related errors (but not our MFA_REQUIRED)
-            mfa_keywords = [
-                "MFA session storage failed",  # Our storage error
-                "MFA verification failed",
-                "MFA session expired"
-            ]
-            if any(keyword.lower() in error_msg.lower() for keyword in mfa_keywords):
+            if _MFA_ERROR_RE.search(error_msg):
                 # These are actual errors, re-raise as-is
                 raise
 
             # Check for MFA requirement without session_id
-            mfa_indicators = [
-                "2FA", "OTP", "authenticator",
-                "verification code", "verify your identity",
-                "ticket", "mfa", "otp"
-            ]
-            if any(keyword.lower() in error_msg.lower() for keyword in mfa_indicators):
-                logger.info(f"MFA detected in error message, requiring MFA verification")
+            if _MFA_REQUIRED_RE.search(error_msg):
+                logger.info("MFA detected in error message, requiring MFA verification")
                 raise GarminAuthError("MFA_REQUIRED")
 
             # Now check for actual invalid credentials (but not MFA-related)
-            if "401" in error_msg or "Unauthorized" in error_msg:
-                logger.info(f"Login failed with 401/Unauthorized - invalid credentials")
+            if _UNAUTHORIZED_RE.search(error_msg):
+                logger.info("Login failed with 401/Unauthorized - invalid credentials")
                 raise GarminAuthError("Invalid credentials")
             raise GarminAuthError(f"Login failed: {error_msg}")
 
         # If we get here, garth_login succeeded without MFA
-        logger.info(f"garth_login returned: {type(result)}, is_tuple: {isinstance(result, tuple)}")
+        logger.info("garth_login returned: %s, is_tuple: %s", type(result), isinstance(result, tuple))
         if isinstance(result, tuple):
-            logger.info(f"Result length: {len(result)}, first element: {result[0] if len(result) > 0 else 'N/A'}")
+            logger.info("Result length: %s, first element: %s", len(result), result[0] if len(result) > 0 else 'N/A')
 
         # Check if MFA is required (normal flow via garth)
         if isinstance(result, tuple) and len(result) == 2 and result[0] == "needs_mfa":
@@ -344,37 +470,81 @@ def login(
             # result[1] is the client_state dict containing 'client' and 'signin_params'
             client_state_dict = result[1]
             signin_params = client_state_dict.get("signin_params", {})
-            logger.info(f"Client state keys: {list(client_state_dict.keys())}")
+            logger.info("Client state keys: %s", list(client_state_dict.keys()))
 
             # Store the Client object in server-side session storage
             # This preserves the session context for resume_login
             session_id = store_mfa_session(client, signin_params, is_cn, username, password)
             # Return the session ID to the frontend
-            logger.info(f"MFA session created for normal flow: {session_id[:16]}...")
+            logger.info("MFA session created for normal flow: %s...", session_id[:16])
             raise GarminAuthError(f"MFA_REQUIRED:{session_id}")
 
         # No MFA required - result contains (OAuth1Token, OAuth2Token)
         oauth1, oauth2 = result
         client.oauth1_token = oauth1
         client.oauth2_token = oauth2
-        logger.info(f"Successfully authenticated with {region}")
+        logger.info("Successfully authenticated with %s", region)
 
     # Fetch user profile
+    if not fetch_profile:
+        return client, {'garmin_user_id': None, 'garmin_display_name': None}
     try:
         profile = client.connectapi("/userprofile-service/socialProfile")
         user_info = {
             'garmin_user_id': str(profile.get('id')) if profile.get('id') else None,
             'garmin_display_name': profile.get('displayName'),
         }
-        logger.info(f"User profile fetched: {user_info}")
+        logger.info("User profile fetched: %s", user_info)
     except Exception as e:
-        logger.warning(f"Failed to fetch user profile: {e}")
+        logger.warning("Failed to fetch user profile: %s", e)
         user_info = {'garmin_user_id': None, 'garmin_display_name': None}
 
     return client, user_info
 
 
-def fetch_daily_summary(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+# Garmin profile ID per client. The per-day endpoints need it in the URL, so
+# it is looked up once per client instead of once per fetched day.
+_profile_ids: "weakref.WeakKeyDictionary[Client, Any]" = weakref.WeakKeyDictionary()
+_profile_ids_lock = threading.Lock()
+
+
+def _cached_profile_id(client: "Client") -> Any:
+    """Return the memoized Garmin profile ID for a client, or None."""
+    with _profile_ids_lock:
+        return _profile_ids.get(client)
+
+
+def _remember_profile_id(client: "Client", profile_id: Any) -> Any:
+    """Memoize a client's Garmin profile ID unless one is known; return the stored ID."""
+    with _profile_ids_lock:
+        return _profile_ids.setdefault(client, profile_id)
+
+
+def _garmin_profile_id(client: "Client") -> Any:
+    """
+    Return the Garmin profile ID for a client, fetching socialProfile at most once.
+
+    Args:
+        client: Authenticated garth Client
+
+    Returns:
+        Profile ID, or None if the profile has no ID
+    """
+    profile_id = _cached_profile_id(client)
+    if profile_id is not None:
+        return profile_id
+
+    # Fetch outside the lock so one slow request doesn't stall lookups for
+    # other clients. Threads racing on the same client may both fetch; the
+    # first stored ID wins.
+    profile = client.connectapi("/userprofile-service/socialProfile")
+    profile_id = profile.get('id') if profile else None
+    if not profile_id:
+        return profile_id
+    return _remember_profile_id(client, profile_id)
+
+
+def fetch_daily_summary(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily wellness summary from Garmin.
 
@@ -386,15 +556,9 @@ def fetch_daily_summary(client: Client, target_date: date) -> Optional[Dict[str,
         Daily summary data dictionary or None
     """
     try:
-        date_str = target_date.strftime('%Y-%m-%d')
-
-        # Get user_id from profile first
-        profile = client.connectapi("/userprofile-service/socialProfile")
-        if not profile:
-            logger.error("Cannot get profile to find user ID")
-            return None
+        date_str = target_date.isoformat()
 
-        user_id = profile.get('id')
+        user_id = _garmin_profile_id(client)
         if not user_id:
             logger.error("No user ID in profile")
             return None
@@ -404,15 +568,15 @@ def fetch_daily_summary(client: Client, target_date: date) -> Optional[Dict[str,
             f"/wellness-service/wellness/dailySleepData/{user_id}?date={date_str}"
         )
 
-        logger.info(f"Fetched daily summary for {date_str}")
+        logger.info("Fetched daily summary for %s", date_str)
         return summary
 
     except Exception as e:
-        logger.warning(f"Error fetching daily summary for {target_date}: {e}")
+        logger.warning("Error fetching daily summary for %s: %s", target_date, e)
         return None
 
 
-def fetch_daily_wellness(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_daily_wellness(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily wellness summary (steps, distance, calories) from Garmin.
 
@@ -426,28 +590,28 @@ def fetch_daily_wellness(client: Client, target_date: date) -> Optional[Dict[str
     Returns:
         Daily wellness data dictionary or None
     """
+    from garth.stats import DailySteps
     result = {}
 
     # Fetch steps and distance from Stats API
     try:
         steps_data = DailySteps.list(end=target_date, period=1, client=client)
-        logger.debug(f"DailySteps.list() returned {len(steps_data)} items for {target_date}")
+        logger.debug("DailySteps.list() returned %s items for %s", len(steps_data), target_date)
         if steps_data:
             data = steps_data[0]
             result['totalSteps'] = data.total_steps
             result['totalDistanceMeters'] = data.total_distance
-            logger.debug(f"Steps data for {target_date}: steps={data.total_steps}, distance={data.total_distance}m")
+            logger.debug("Steps data for %s: steps=%s, distance=%sm", target_date, data.total_steps, data.total_distance)
     except Exception as e:
-        logger.warning(f"Error fetching daily steps for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily steps for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
 
     # Try to fetch calories from wellness summary endpoint
     # Note: This may not work for CN users (returns 405)
     try:
-        date_str = target_date.strftime('%Y-%m-%d')
-        profile = client.connectapi("/userprofile-service/socialProfile")
-        if profile and profile.get('id'):
-            user_id = profile['id']
+        date_str = target_date.isoformat()
+        user_id = _garmin_profile_id(client)
+        if user_id:
             wellness_summary = client.connectapi(
                 f"/wellness-service/wellness/dailySummary/{user_id}?date={date_str}"
             )
@@ -455,20 +619,44 @@ def fetch_daily_wellness(client: Client, target_date: date) -> Optional[Dict[str
                 # Extract calories from various possible fields
                 if 'totalKilocalories' in wellness_summary:
                     result['totalKilocalories'] = wellness_summary['totalKilocalories']
-                    logger.debug(f"Calories from totalKilocalories: {wellness_summary['totalKilocalories']}")
+                    logger.debug("Calories from totalKilocalories: %s", wellness_summary['totalKilocalories'])
                 elif 'kilocalories' in wellness_summary:
                     result['totalKilocalories'] = wellness_summary['kilocalories']
-                    logger.debug(f"Calories from kilocalories: {wellness_summary['kilocalories']}")
+                    logger.debug("Calories from kilocalories: %s", wellness_summary['kilocalories'])
                 elif 'activeKilocalories' in wellness_summary:
                     result['totalKilocalories'] = wellness_summary['activeKilocalories']
-                    logger.debug(f"Calories from activeKilocalories: {wellness_summary['activeKilocalories']}")
+                    logger.debug("Calories from activeKilocalories: %s", wellness_summary['activeKilocalories'])
     except Exception as e:
-        logger.debug(f"Could not fetch calories from wellness summary (expected for CN users): {e}")
+        logger.debug("Could not fetch calories from wellness summary (expected for CN users): %s", e)
 
     return result if result else None
 
 
-def fetch_daily_intensity(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def _intensity_result(data: Any) -> Dict[str, Any]:
+    """Convert a DailyIntensityMinutes stat into the intensity dict used by the mapper."""
+    return {
+        'moderate_minutes': data.moderate_value,
+        'vigorous_minutes': data.vigorous_value,
+        'total_minutes': (data.moderate_value or 0) + (data.vigorous_value or 0),
+    }
+
+
+def _stress_result(data: Any) -> Dict[str, Any]:
+    """Convert a DailyStress stat into the stress dict used by the mapper."""
+    return {'overall_stress_level': data.overall_stress_level}
+
+
+def _steps_result(data: Any) -> Dict[str, Any]:
+    """Convert a DailySteps stat into the steps dict used by the mapper."""
+    return {'total_steps': data.total_steps, 'total_distance': data.total_distance}
+
+
+def _hrv_result(data: Any) -> Dict[str, Any]:
+    """Convert a DailyHRV stat into the HRV dict used by the mapper."""
+    return {'last_night_avg': data.last_night_avg, 'weekly_avg': data.weekly_avg, 'status': data.status}
+
+
+def fetch_daily_intensity(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily intensity minutes (exercise duration) from Garmin using garth Stats API.
 
@@ -481,27 +669,23 @@ def fetch_daily_intensity(client: Client, target_date: date) -> Optional[Dict[st
     Returns:
         Dictionary with moderate and vigorous intensity minutes
     """
+    from garth.stats import DailyIntensityMinutes
     try:
         intensity_data = DailyIntensityMinutes.list(end=target_date, period=1, client=client)
-        logger.debug(f"DailyIntensityMinutes.list() returned {len(intensity_data)} items for {target_date}")
+        logger.debug("DailyIntensityMinutes.list() returned %s items for %s", len(intensity_data), target_date)
         if intensity_data:
-            data = intensity_data[0]
-            total_minutes = (data.moderate_value or 0) + (data.vigorous_value or 0)
-            logger.debug(f"Intensity data for {target_date}: moderate={data.moderate_value}, vigorous={data.vigorous_value}, total={total_minutes}")
-            return {
-                'moderate_minutes': data.moderate_value,
-                'vigorous_minutes': data.vigorous_value,
-                'total_minutes': total_minutes,
-            }
-        logger.warning(f"DailyIntensityMinutes.list() returned empty or None data for {target_date}")
+            result = _intensity_result(intensity_data[0])
+            logger.debug("Intensity data for %s: %s", target_date, result)
+            return result
+        logger.warning("DailyIntensityMinutes.list() returned empty or None data for %s", target_date)
         return None
     except Exception as e:
-        logger.warning(f"Error fetching daily intensity for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily intensity for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_daily_body_battery(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_daily_body_battery(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily body battery data from Garmin using garth Stats API.
 
@@ -512,9 +696,10 @@ def fetch_daily_body_battery(client: Client, target_date: date) -> Optional[Dict
     Returns:
         Dictionary with current_body_battery, min, max values or None
     """
+    from garth import DailyBodyBatteryStress
     try:
         bb_data = DailyBodyBatteryStress.list(end=target_date, days=1, client=client)
-        logger.debug(f"DailyBodyBatteryStress.list() returned {len(bb_data)} items for {target_date}")
+        logger.debug("DailyBodyBatteryStress.list() returned %s items for %s", len(bb_data), target_date)
         if bb_data:
             data = bb_data[0]
             result = {
@@ -522,16 +707,16 @@ def fetch_daily_body_battery(client: Client, target_date: date) -> Optional[Dict
                 'min_body_battery': data.min_body_battery,
                 'max_body_battery': data.max_body_battery,
             }
-            logger.debug(f"Body battery for {target_date}: current={data.current_body_battery}")
+            logger.debug("Body battery for %s: current=%s", target_date, data.current_body_battery)
             return result
         return None
     except Exception as e:
-        logger.warning(f"Error fetching daily body battery for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily body battery for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_daily_stress(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_daily_stress(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily stress level data from Garmin using garth Stats API.
 
@@ -542,24 +727,22 @@ def fetch_daily_stress(client: Client, target_date: date) -> Optional[Dict[str,
     Returns:
         Dictionary with overall_stress_level or None
     """
+    from garth.stats import DailyStress
     try:
-        stress_data = DailyStress.list(period=1, client=client)
-        logger.debug(f"DailyStress.list() returned {len(stress_data)} items for {target_date}")
+        stress_data = DailyStress.list(end=target_date, period=1, client=client)
+        logger.debug("DailyStress.list() returned %s items for %s", len(stress_data), target_date)
         if stress_data:
-            data = stress_data[0]
-            result = {
-                'overall_stress_level': data.overall_stress_level,
-            }
-            logger.debug(f"Stress for {target_date}: overall={data.overall_stress_level}")
+            result = _stress_result(stress_data[0])
+            logger.debug("Stress for %s: %s", target_date, result)
             return result
         return None
     except Exception as e:
-        logger.warning(f"Error fetching daily stress for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily stress for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_body_battery_events(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_body_battery_events(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch full 24-hour body battery and stress data from Garmin.
 
@@ -573,17 +756,18 @@ def fetch_body_battery_events(client: Client, target_date: date) -> Optional[Dic
     Returns:
         Dictionary with body_battery_readings and stress_readings lists, or None
     """
+    from garth import DailyBodyBatteryStress
     try:
         data = DailyBodyBatteryStress.get(target_date, client=client)
         if not data:
-            logger.warning(f"DailyBodyBatteryStress.get() returned None for {target_date}")
+            logger.warning("DailyBodyBatteryStress.get() returned None for %s", target_date)
             return None
 
         # Log raw API response details for debugging
-        logger.info(f"DailyBodyBatteryStress response type: {type(data).__name__}")
+        logger.info("DailyBodyBatteryStress response type: %s", type(data).__name__)
         bb_array_len = len(data.body_battery_values_array) if data.body_battery_values_array else 0
         stress_array_len = len(data.stress_values_array) if data.stress_values_array else 0
-        logger.info(f"Raw arrays - body_battery_values_array: {bb_array_len}, stress_values_array: {stress_array_len}")
+        logger.info("Raw arrays - body_battery_values_array: %s, stress_values_array: %s", bb_array_len, stress_array_len)
 
         result = {
             'body_battery_readings': [],
@@ -614,21 +798,23 @@ def fetch_body_battery_events(client: Client, target_date: date) -> Optional[Dic
             timestamps = [r['timestamp'] for r in result['body_battery_readings']]
             start_ts = datetime.utcfromtimestamp(min(timestamps) / 1000)
             end_ts = datetime.utcfromtimestamp(max(timestamps) / 1000)
-            logger.info(f"Fetched {len(result['body_battery_readings'])} body battery and "
-                        f"{len(result['stress_readings'])} stress readings for {target_date}")
-            logger.info(f"Body battery time range: {start_ts.strftime('%H:%M')} to {end_ts.strftime('%H:%M')} UTC")
+            logger.info(
+                "Fetched %s body battery and %s stress readings for %s",
+                len(result['body_battery_readings']), len(result['stress_readings']), target_date
+            )
+            logger.info("Body battery time range: %s to %s UTC", start_ts.strftime('%H:%M'), end_ts.strftime('%H:%M'))
         else:
-            logger.warning(f"No body battery readings extracted for {target_date}")
+            logger.warning("No body battery readings extracted for %s", target_date)
 
         return result
 
     except Exception as e:
-        logger.warning(f"Error fetching body battery data for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching body battery data for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_daily_steps(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_daily_steps(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily steps data from Garmin using garth Stats API.
 
@@ -639,25 +825,22 @@ def fetch_daily_steps(client: Client, target_date: date) -> Optional[Dict[str, A
     Returns:
         Dictionary with total_steps, total_distance or None
     """
+    from garth.stats import DailySteps
     try:
-        steps_data = DailySteps.list(period=1, client=client)
-        logger.debug(f"DailySteps.list(period=1) returned {len(steps_data)} items")
+        steps_data = DailySteps.list(end=target_date, period=1, client=client)
+        logger.debug("DailySteps.list() returned %s items for %s", len(steps_data), target_date)
         if steps_data:
-            data = steps_data[0]
-            result = {
-                'total_steps': data.total_steps,
-                'total_distance': data.total_distance,
-            }
-            logger.debug(f"Steps for {target_date}: steps={data.total_steps}, distance={data.total_distance}m")
+            result = _steps_result(steps_data[0])
+            logger.debug("Steps for %s: %s", target_date, result)
             return result
         return None
     except Exception as e:
-        logger.warning(f"Error fetching daily steps for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily steps for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_daily_hrv(client: Client, target_date: date) -> Optional[Dict[str, Any]]:
+def fetch_daily_hrv(client: "Client", target_date: date) -> Optional[Dict[str, Any]]:
     """
     Fetch daily HRV (Heart Rate Variability) data from Garmin using garth Stats API.
 
@@ -668,26 +851,22 @@ def fetch_daily_hrv(client: Client, target_date: date) -> Optional[Dict[str, Any
     Returns:
         Dictionary with last_night_avg, weekly_avg, status or None
     """
+    from garth.stats import DailyHRV
     try:
-        hrv_data = DailyHRV.list(period=1, client=client)
-        logger.debug(f"DailyHRV.list(period=1) returned {len(hrv_data)} items")
+        hrv_data = DailyHRV.list(end=target_date, period=1, client=client)
+        logger.debug("DailyHRV.list() returned %s items for %s", len(hrv_data), target_date)
         if hrv_data:
-            data = hrv_data[0]
-            result = {
-                'last_night_avg': data.last_night_avg,
-                'weekly_avg': data.weekly_avg,
-                'status': data.status,
-            }
-            logger.debug(f"HRV for {target_date}: last_night={data.last_night_avg}, weekly={data.weekly_avg}, status={data.status}")
+            result = _hrv_result(hrv_data[0])
+            logger.debug("HRV for %s: %s", target_date, result)
             return result
         return None
     except Exception as e:
-        logger.warning(f"Error fetching daily HRV for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching daily HRV for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return None
 
 
-def fetch_daily_activities(client: Client, target_date: date) -> List[Dict[str, Any]]:
+def fetch_daily_activities(client: "Client", target_date: date) -> List[Dict[str, Any]]:
     """
     Fetch activities for a specific date from Garmin.
 
@@ -699,16 +878,16 @@ def fetch_daily_activities(client: Client, target_date: date) -> List[Dict[str,
         List of activity dictionaries or empty list
     """
     try:
-        date_str = target_date.strftime('%Y-%m-%d')
+        date_str = target_date.isoformat()
         # Use activitylist-service endpoint (same as garminconnect library)
         activities = client.connectapi(
             f"/activitylist-service/activities/search/activities?startDate={date_str}&endDate={date_str}"
         )
-        logger.debug(f"Activities for {date_str}: count={len(activities) if activities else 0}")
+        logger.debug("Activities for %s: count=%s", date_str, len(activities) if activities else 0)
         return activities if activities else []
     except Exception as e:
-        logger.warning(f"Error fetching activities for {target_date}: {e}")
-        logger.debug(traceback.format_exc())
+        logger.warning("Error fetching activities for %s: %s", target_date, e)
+        logger.debug("Full traceback:", exc_info=True)
         return []
 
 
@@ -725,13 +904,17 @@ def parse_garmin_time(time_str: Optional[str]) -> Optional[datetime]:
     if not time_str:
         return None
     try:
-        return datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+        # Python 3.11+ parses a trailing 'Z' directly
+        return datetime.fromisoformat(time_str)
     except (ValueError, AttributeError):
         return None
 
 
 def _safe_int(value: Any) -> Optional[int]:
     """Safely convert value to int, returning None if conversion fails."""
+    # Garmin JSON numbers are usually already ints; skip the conversion
+    if type(value) is int:
+        return value
     if value is None:
         return None
     try:
@@ -742,6 +925,8 @@ def _safe_int(value: Any) -> Optional[int]:
 
 def _safe_float(value: Any) -> Optional[float]:
     """Safely convert value to float, returning None if conversion fails."""
+    if type(value) is float:
+        return value
     if value is None:
         return None
     try:
@@ -750,6 +935,66 @@ def _safe_float(value: Any) -> Optional[float]:
         return None
 
 
+# Every field set to None; copied into each mapped metric as the starting point
+_EMPTY_HEALTH_METRIC: Dict[str, Any] = dict.fromkeys(HEALTH_METRIC_FIELDS)
+
+# (metric field, key path) for sleep durations reported in seconds
+_SLEEP_DURATION_PATHS = (
+    ('sleep_hours', ('dailySleepDTO', 'sleepTimeSeconds')),
+    ('deep_sleep_hours', ('dailySleepDTO', 'deepSleepSeconds')),
+    ('light_sleep_hours', ('dailySleepDTO', 'lightSleepSeconds')),
+    ('rem_sleep_hours', ('dailySleepDTO', 'remSleepSeconds')),
+)
+_SLEEP_SCORE_PATH = ('dailySleepDTO', 'sleepScores', 'overall')
+
+# (metric field, source key, converter, divisor) applied to a single source dict.
+# Later tables override earlier ones, so real-time sources are listed last.
+_WELLNESS_FIELDS = (
+    ('steps', 'totalSteps', _safe_int, 1),
+    ('distance_km', 'totalDistanceMeters', _safe_float, 1000),
+    ('calories', 'totalKilocalories', _safe_int, 1),
+)
+_INTENSITY_FIELDS = (
+    ('exercise_minutes', 'total_minutes', _safe_int, 1),
+)
+_STRESS_FIELDS = (
+    ('stress_level', 'overall_stress_level', _safe_int, 1),
+)
+_STEPS_FIELDS = (
+    ('steps', 'total_steps', _safe_int, 1),
+)
+_HRV_FIELDS = (
+    ('hrv_last_night', 'last_night_avg', _safe_int, 1),
+    ('hrv_weekly_avg', 'weekly_avg', _safe_int, 1),
+    ('hrv_status', 'status', None, 1),
+)
+
+
+def _dig(data: Any, path: Tuple[str, ...]) -> Any:
+    """Follow a key path through nested dicts, returning None if any step is missing."""
+    try:
+        for key in path:
+            data = data.get(key)
+    except AttributeError:
+        return None
+    return data
+
+
+def _apply_fields(metric: Dict[str, Any], source: Optional[Dict[str, Any]], fields: tuple) -> None:
+    """Copy non-None values from source into metric according to a field table."""
+    if not source:
+        return
+    for field, key, convert, divisor in fields:
+        value = source.get(key)
+        if value is None:
+            continue
+        if convert is not None:
+            value = convert(value)
+            if value is not None and divisor != 1:
+                value = value / divisor
+        metric[field] = value
+
+
 def map_garmin_to_health_metric(
     user_id: int,
     garmin_data: Dict[str, Any],
@@ -778,154 +1023,115 @@ def map_garmin_to_health_metric(
     Returns:
         Dictionary with HealthMetric fields
     """
-    metric = {
-        'user_id': user_id,
-        'date': metric_date,
-        'sleep_hours': None,
-        'light_sleep_hours': None,
-        'deep_sleep_hours': None,
-        'rem_sleep_hours': None,
-        'resting_heart_rate': None,
-        'stress_level': None,
-        'exercise_minutes': None,
-        'steps': None,
-        'calories': None,
-        'distance_km': None,
-        'body_battery': None,
-        'body_battery_before_sleep': None,
-        'spo2': None,
-        'respiration_rate': None,
-        'resting_hr': None,
-        'sleep_score': None,
-        'hrv_last_night': None,
-        'hrv_weekly_avg': None,
-        'hrv_status': None,
-    }
-
-    # Extract data from dailySleepDTO structure
-    if 'dailySleepDTO' in garmin_data:
-        dto = garmin_data.get('dailySleepDTO', {})
-        if dto:
-            if dto.get('sleepTimeSeconds'):
-                metric['sleep_hours'] = dto['sleepTimeSeconds'] / 3600
-            if dto.get('deepSleepSeconds'):
-                metric['deep_sleep_hours'] = dto['deepSleepSeconds'] / 3600
-            if dto.get('lightSleepSeconds'):
-                metric['light_sleep_hours'] = dto['lightSleepSeconds'] / 3600
-            if dto.get('remSleepSeconds'):
-                metric['rem_sleep_hours'] = dto['remSleepSeconds'] / 3600
-            if dto.get('sleepScores'):
-                scores = dto.get('sleepScores', {})
-                if isinstance(scores, dict) and 'overall' in scores:
-                    overall = scores['overall']
-                    if isinstance(overall, dict) and 'value' in overall:
-                        metric['sleep_score'] = _safe_int(overall['value'])
-                    elif isinstance(overall, int):
-                        metric['sleep_score'] = overall
-
-    # Extract resting heart rate
-    if 'restingHeartRate' in garmin_data and garmin_data['restingHeartRate']:
-        metric['resting_hr'] = _safe_int(garmin_data['restingHeartRate'])
-        metric['resting_heart_rate'] = metric['resting_hr']
-
-    # Extract stress from sleepStress array
-    if 'sleepStress' in garmin_data and garmin_data['sleepStress']:
-        stress_values = [s.get('value') for s in garmin_data['sleepStress'] if s.get('value') is not None]
-        if stress_values:
-            metric['stress_level'] = _safe_int(sum(stress_values) / len(stress_values))
-
-    # Extract body battery - prefer real-time data over sleep data
-    # Also extract before_sleep value from sleepBodyBattery array
+    metric: Dict[str, Any] = {'user_id': user_id, 'date': metric_date, **_EMPTY_HEALTH_METRIC}
+
+    # Sleep durations and score from dailySleepDTO
+    for field, path in _SLEEP_DURATION_PATHS:
+        seconds = _dig(garmin_data, path)
+        if seconds:
+            metric[field] = seconds / 3600
+    overall = _dig(garmin_data, _SLEEP_SCORE_PATH)
+    if isinstance(overall, dict):
+        metric['sleep_score'] = _safe_int(overall.get('value'))
+    elif isinstance(overall, int):
+        metric['sleep_score'] = overall
+
+    resting_hr = garmin_data.get('restingHeartRate')
+    if resting_hr:
+        metric['resting_hr'] = metric['resting_heart_rate'] = _safe_int(resting_hr)
+
+    # Sleep stress average (overridden below by real-time stress when available)
+    stress_total = 0
+    stress_count = 0
+    for s in garmin_data.get('sleepStress') or ():
+        if (value := s.get('value')) is not None:
+            stress_total += value
+            stress_count += 1
+    if stress_count:
+        metric['stress_level'] = _safe_int(stress_total / stress_count)
+
+    # Body battery - prefer real-time data over sleep data
     if body_battery_data and body_battery_data.get('current_body_battery') is not None:
         metric['body_battery'] = _safe_int(body_battery_data['current_body_battery'])
-        logger.debug(f"    Using real-time body_battery: {metric['body_battery']}")
-    elif 'sleepBodyBattery' in garmin_data and garmin_data['sleepBodyBattery']:
-        bb_values = [b.get('value') for b in garmin_data['sleepBodyBattery'] if b.get('value') is not None]
-        if bb_values:
-            # 最后一个值是醒来后身体电量
-            metric['body_battery'] = _safe_int(bb_values[-1])
-            # 第一个值是入睡前身体电量
-            metric['body_battery_before_sleep'] = _safe_int(bb_values[0])
-            logger.debug(f"    Using sleep body_battery (fallback): {metric['body_battery']}, before_sleep: {metric['body_battery_before_sleep']}")
-
-    # Extract SpO2 (case-insensitive key lookup)
-    spo2_key = next((k for k in garmin_data.keys() if 'spo2sleepsummarydto' in k.lower()), None)
+    else:
+        sleep_bb = garmin_data.get('sleepBodyBattery') or []
+        first_bb = next((b['value'] for b in sleep_bb if b.get('value') is not None), None)
+        if first_bb is not None:
+            # 最后一个值是醒来后身体电量，第一个值是入睡前身体电量
+            last_bb = next(b['value'] for b in reversed(sleep_bb) if b.get('value') is not None)
+            metric['body_battery'] = _safe_int(last_bb)
+            metric['body_battery_before_sleep'] = _safe_int(first_bb)
+
+    # SpO2 and respiration use inconsistent key casing across API versions,
+    # so resolve both keys in a single pass over the top-level keys
+    spo2_key = respiration_key = None
+    for key in garmin_data:
+        lower = key.lower()
+        if spo2_key is None and 'spo2sleepsummarydto' in lower:
+            spo2_key = key
+        elif respiration_key is None and 'respiration' in lower and ('dto' in lower or 'list' in lower or 'average' in lower):
+            respiration_key = key
+
     if spo2_key:
         spo2_data = garmin_data[spo2_key]
-        # Case-insensitive check for avgSpO2 key - try both 'averageSpO2' and 'avgSpO2'
-        avg_spo2_key = next((k for k in spo2_data.keys() if k.lower() in ('avgspo2', 'averagespo2')), None)
+        avg_spo2_key = next((k for k in spo2_data if k.lower() in ('avgspo2', 'averagespo2')), None)
         if avg_spo2_key:
             metric['spo2'] = _safe_float(spo2_data[avg_spo2_key])
-            logger.debug(f"    Mapping SpO2: {spo2_data[avg_spo2_key]}% -> {metric['spo2']}")
 
-    # Extract respiration (case-insensitive key lookup)
-    # Try both 'wellnessEpochRespirationDataDTOList' and 'respirationAveragesList'
-    respiration_key = next((k for k in garmin_data.keys() if 'respiration' in k.lower() and ('dto' in k.lower() or 'list' in k.lower() or 'average' in k.lower())), None)
     if respiration_key:
-        resp_list = garmin_data[respiration_key]
-        # Check for respirationValue key (new API) or breathsPerMinute key (old API)
-        resp_values = []
-        for r in resp_list:
-            # Try 'respirationValue' first (new Garmin API format)
+        resp_total = 0.0
+        resp_count = 0
+        for r in garmin_data[respiration_key]:
             if 'respirationValue' in r:
-                if r['respirationValue'] is not None:
-                    resp_values.append(r['respirationValue'])
+                value = r['respirationValue']
             else:
                 # Fallback to old 'breathsPerMinute' format
-                bpm_key = next((k for k in r.keys() if k.lower() == 'breathsperminute'), None)
-                if bpm_key and r[bpm_key] is not None:
-                    resp_values.append(r[bpm_key])
-        if resp_values:
-            metric['respiration_rate'] = _safe_float(sum(resp_values) / len(resp_values))
-            logger.debug(f"    Mapping respiration_rate: {metric['respiration_rate']} bpm (from {len(resp_values)} readings)")
-
-    # Extract activity data from wellness summary (steps, distance, calories)
-    if wellness_data:
-        if 'totalSteps' in wellness_data:
-            metric['steps'] = _safe_int(wellness_data['totalSteps'])
-            logger.debug(f"    Mapping steps: {wellness_data['totalSteps']} -> {metric['steps']}")
-        if 'totalDistanceMeters' in wellness_data:
-            metric['distance_km'] = _safe_float(wellness_data['totalDistanceMeters'] / 1000)
-            logger.debug(f"    Mapping distance: {wellness_data['totalDistanceMeters']}m -> {metric['distance_km']}km")
-        if 'totalKilocalories' in wellness_data:
-            metric['calories'] = _safe_int(wellness_data['totalKilocalories'])
-            logger.debug(f"    Mapping calories: {wellness_data['totalKilocalories']} -> {metric['calories']}")
-
-    # Extract exercise minutes from intensity data
-    if intensity_data and 'total_minutes' in intensity_data:
-        metric['exercise_minutes'] = _safe_int(intensity_data['total_minutes'])
-        logger.debug(f"    Mapping exercise_minutes: {intensity_data['total_minutes']} -> {metric['exercise_minutes']}")
-
-    # Extract stress level from daily stress data - prefer real-time data over sleep stress
-    if stress_data and stress_data.get('overall_stress_level') is not None:
-        metric['stress_level'] = _safe_int(stress_data['overall_stress_level'])
-        logger.debug(f"    Using real-time stress_level: {metric['stress_level']}")
-
-    # Extract steps from daily steps data - prefer real-time data over wellness data
-    if steps_data and steps_data.get('total_steps') is not None:
-        metric['steps'] = _safe_int(steps_data['total_steps'])
-        logger.debug(f"    Using real-time steps: {metric['steps']}")
-
-    # Extract HRV data
-    if hrv_data:
-        if hrv_data.get('last_night_avg') is not None:
-            metric['hrv_last_night'] = _safe_int(hrv_data['last_night_avg'])
-            logger.debug(f"    Mapping hrv_last_night: {hrv_data['last_night_avg']} -> {metric['hrv_last_night']}")
-        if hrv_data.get('weekly_avg') is not None:
-            metric['hrv_weekly_avg'] = _safe_int(hrv_data['weekly_avg'])
-            logger.debug(f"    Mapping hrv_weekly_avg: {hrv_data['weekly_avg']} -> {metric['hrv_weekly_avg']}")
-        if hrv_data.get('status') is not None:
-            metric['hrv_status'] = hrv_data['status']
-            logger.debug(f"    Mapping hrv_status: {hrv_data['status']} -> {metric['hrv_status']}")
-
+                bpm_key = next((k for k in r if k.lower() == 'breathsperminute'), None)
+                value = r[bpm_key] if bpm_key else None
+            if value is not None:
+                resp_total += value
+                resp_count += 1
+        if resp_count:
+            metric['respiration_rate'] = _safe_float(resp_total / resp_count)
+
+    _apply_fields(metric, wellness_data, _WELLNESS_FIELDS)
+    _apply_fields(metric, intensity_data, _INTENSITY_FIELDS)
+    _apply_fields(metric, stress_data, _STRESS_FIELDS)
+    _apply_fields(metric, steps_data, _STEPS_FIELDS)
+    _apply_fields(metric, hrv_data, _HRV_FIELDS)
+
+    logger.debug("    Mapped Garmin data for %s: %s", metric_date, metric)
     return metric
 
 
+def _stored_activity_ids(db_session, user_id: int, activity_ids: List[int]) -> set:
+    """
+    Return which of the given Garmin activity IDs are already stored, in one query.
+
+    Args:
+        db_session: Database session
+        user_id: User ID
+        activity_ids: Garmin activity IDs to check
+
+    Returns:
+        Set of activity IDs that already have a GarminActivity row
+    """
+    if not activity_ids:
+        return set()
+    return {
+        activity_id for (activity_id,) in db_session.query(GarminActivity.garmin_activity_id).filter(
+            GarminActivity.user_id == user_id,
+            GarminActivity.garmin_activity_id.in_(activity_ids)
+        )
+    }
+
+
 def save_garmin_activities(
     user_id: int,
     activities: List[Dict[str, Any]],
     activity_date: date,
-    db_session
+    db_session,
+    existing_ids: Optional[set] = None
 ) -> int:
     """
     Save detailed Garmin activities to database.
@@ -935,50 +1141,69 @@ def save_garmin_activities(
         activities: List of activity data from Garmin
         activity_date: Date of the activities
         db_session: Database session
+        existing_ids: Already stored activity IDs, looked up when not given;
+            saved IDs are added to it
 
     Returns:
         Number of activities saved
     """
-    count = 0
+    rows = []
+    if existing_ids is None:
+        existing_ids = _stored_activity_ids(
+            db_session, user_id, [a.get('activityId') for a in activities if a.get('activityId')]
+        )
+
     for activity in activities:
         garmin_activity_id = activity.get('activityId')
 
-        # Skip if no activity ID
-        if not garmin_activity_id:
-            continue
-
-        # Check if activity already exists
-        existing = db_session.query(GarminActivity).filter(
-            GarminActivity.user_id == user_id,
-            GarminActivity.garmin_activity_id == garmin_activity_id
-        ).first()
-
-        if existing:
+        # Skip if no activity ID or already stored
+        if not garmin_activity_id or garmin_activity_id in existing_ids:
             continue
+        existing_ids.add(garmin_activity_id)
 
         activity_type_info = activity.get('activityType', {})
-        new_activity = GarminActivity(
-            user_id=user_id,
-            date=activity_date,
-            garmin_activity_id=garmin_activity_id,
-            activity_type=activity_type_info.get('typeKey'),
-            activity_type_key=activity_type_info.get('typeKey'),
-            name=activity.get('activityName'),
-            duration_seconds=activity.get('duration'),
-            distance_meters=activity.get('distance'),
-            calories=activity.get('calories'),
-            average_heartrate=activity.get('averageHR'),
-            max_heartrate=activity.get('maxHR'),
-            avg_speed_mps=activity.get('averageSpeed'),
-            max_speed_mps=activity.get('maxSpeed'),
-            elevation_gain_meters=activity.get('elevationGain'),
-            start_time=parse_garmin_time(activity.get('startTimeGMT')),
-            start_time_local=parse_garmin_time(activity.get('startTimeLocal')),
+        rows.append({
+            'user_id': user_id,
+            'date': activity_date,
+            'garmin_activity_id': garmin_activity_id,
+            'activity_type': activity_type_info.get('typeKey'),
+            'activity_type_key': activity_type_info.get('typeKey'),
+            'name': activity.get('activityName'),
+            'duration_seconds': activity.get('duration'),
+            'distance_meters': activity.get('distance'),
+            'calories': activity.get('calories'),
+            'average_heartrate': activity.get('averageHR'),
+            'max_heartrate': activity.get('maxHR'),
+            'avg_speed_mps': activity.get('averageSpeed'),
+            'max_speed_mps': activity.get('maxSpeed'),
+            'elevation_gain_meters': activity.get('elevationGain'),
+            'start_time': parse_garmin_time(activity.get('startTimeGMT')),
+            'start_time_local': parse_garmin_time(activity.get('startTimeLocal')),
+        })
+
+    if rows:
+        # Insert-only: an ID stored since the lookup is left as it is
+        stmt = dialect_insert(db_session, GarminActivity).on_conflict_do_nothing(
+            index_elements=['garmin_activity_id']
         )
-        db_session.add(new_activity)
-        count += 1
+        db_session.execute(stmt, rows)
+    return len(rows)
 
-    return count
+
+@functools.lru_cache(maxsize=64)
+def _utc_day_bounds(target_date: date, utc_offset: timedelta) -> Tuple[datetime, datetime]:
+    """
+    Convert a local calendar day to a naive UTC [start, end) range.
+
+    Args:
+        target_date: Local date
+        utc_offset: Local UTC offset to apply
+
+    Returns:
+        Tuple of (start, end) naive UTC datetimes, exactly one day apart
+    """
+    start = datetime.combine(target_date, datetime.min.time()) - utc_offset
+    return start, start + timedelta(days=1)
 
 
 def save_body_status_timeseries(
@@ -1004,20 +1229,18 @@ def save_body_status_timeseries(
     Returns:
         Number of timeseries records saved
     """
-    count = 0
-
     # Log data source info for debugging
     bb_events_count = len(body_battery_events.get('body_battery_readings', [])) if body_battery_events else 0
     stress_events_count = len(body_battery_events.get('stress_readings', [])) if body_battery_events else 0
-    logger.info(f"save_body_status_timeseries: body_battery_events has {bb_events_count} BB, {stress_events_count} stress readings")
+    logger.info(
+        "save_body_status_timeseries: body_battery_events has %s BB, %s stress readings",
+        bb_events_count, stress_events_count
+    )
 
     # Delete existing timeseries data for this user and date
     # Convert local date to UTC range to match how data is saved (UTC naive datetime)
     local_tz_offset = datetime.now().astimezone().utcoffset() or timedelta(0)
-    local_start = datetime.combine(target_date, datetime.min.time())
-    local_end = datetime.combine(target_date + timedelta(days=1), datetime.min.time())
-    start_dt = local_start - local_tz_offset
-    end_dt = local_end - local_tz_offset
+    start_dt, end_dt = _utc_day_bounds(target_date, local_tz_offset)
     db_session.query(BodyStatusTimeseries).filter(
         BodyStatusTimeseries.user_id == user_id,
         BodyStatusTimeseries.timestamp >= start_dt,
@@ -1079,232 +1302,427 @@ def save_body_status_timeseries(
                 if 'stress_level' not in data_by_timestamp[ts]:
                     data_by_timestamp[ts]['stress_level'] = _safe_int(value)
 
-    # Create records for each timestamp
-    for ts, values in data_by_timestamp.items():
-        record = BodyStatusTimeseries(
-            user_id=user_id,
-            timestamp=ts,
-            body_battery=values.get('body_battery'),
-            stress_level=values.get('stress_level'),
-            heart_rate=values.get('heart_rate')
-        )
-        db_session.add(record)
-        count += 1
+    # Insert a record for each timestamp in one executemany, bypassing the
+    # unit of work since these rows are never read back during the sync
+    db_session.bulk_insert_mappings(BodyStatusTimeseries, [
+        {
+            'user_id': user_id,
+            'timestamp': ts,
+            'body_battery': values.get('body_battery'),
+            'stress_level': values.get('stress_level'),
+            'heart_rate': values.get('heart_rate'),
+        }
+        for ts, values in data_by_timestamp.items()
+    ])
+    count = len(data_by_timestamp)
 
     # Log detailed save summary with time range
     if data_by_timestamp:
-        timestamps = sorted(data_by_timestamp.keys())
-        start_time = timestamps[0].strftime('%H:%M')
-        end_time = timestamps[-1].strftime('%H:%M')
-        logger.info(f"Saved {count} timeseries records for {target_date}: "
-                    f"{from_events_count} from 24h API, {from_sleep_count} from sleep fallback")
-        logger.info(f"Timeseries time range: {start_time} to {end_time} UTC ({len(timestamps)} points)")
+        start_time = min(data_by_timestamp).strftime('%H:%M')
+        end_time = max(data_by_timestamp).strftime('%H:%M')
+        logger.info(
+            "Saved %s timeseries records for %s: %s from 24h API, %s from sleep fallback",
+            count, target_date, from_events_count, from_sleep_count
+        )
+        logger.info("Timeseries time range: %s to %s UTC (%s points)", start_time, end_time, count)
     else:
-        logger.warning(f"No timeseries data to save for {target_date}")
+        logger.warning("No timeseries data to save for %s", target_date)
 
     return count
 
 
+# Per-day data sources fetched during a sync, keyed by result name
+_DAILY_FETCHERS: Dict[str, Callable[["Client", date], Any]] = {
+    'summary': fetch_daily_summary,
+    'wellness': fetch_daily_wellness,
+    'intensity': fetch_daily_intensity,
+    'body_battery': fetch_daily_body_battery,
+    'stress': fetch_daily_stress,
+    'steps': fetch_daily_steps,
+    'hrv': fetch_daily_hrv,
+    'body_battery_events': fetch_body_battery_events,
+    'activities': fetch_daily_activities,
+}
+
+# Sources whose garth Stats endpoint returns a whole date range per request:
+# source name -> (garth.stats class name, result converter)
+_RANGE_STATS: Dict[str, Tuple[str, Callable[[Any], Dict[str, Any]]]] = {
+    'intensity': ('DailyIntensityMinutes', _intensity_result),
+    'stress': ('DailyStress', _stress_result),
+    'steps': ('DailySteps', _steps_result),
+    'hrv': ('DailyHRV', _hrv_result),
+}
+
+
+def fetch_stats_range(client: "Client", name: str, start: date, end: date) -> Dict[date, Dict[str, Any]]:
+    """
+    Fetch one ranged Stats source for every day from start to end.
+
+    garth pages long ranges itself, so this is one request per 28 days
+    instead of one per day.
+
+    Args:
+        client: Authenticated garth Client
+        name: Source name in _RANGE_STATS
+        start: First date (inclusive)
+        end: Last date (inclusive)
+
+    Returns:
+        Dict mapping each date Garmin returned data for to the converted result
+    """
+    import garth.stats
+
+    class_name, convert = _RANGE_STATS[name]
+    stats = getattr(garth.stats, class_name).list(end=end, period=(end - start).days + 1, client=client)
+    return {stat.calendar_date: convert(stat) for stat in stats}
+
+
+# Garmin API calls are network-bound, so a sync fans them out over a thread pool.
+# The semaphore is process-wide to cap in-flight requests across concurrent syncs
+# and avoid tripping Garmin's rate limiting.
+_FETCH_WORKERS = 8
+_fetch_semaphore = threading.Semaphore(4)
+
+
+def _throttled_fetch(fetcher: Callable[["Client", date], Any], client: "Client", target_date: date) -> Any:
+    """Run a single fetch_* call while holding the process-wide fetch semaphore."""
+    with _fetch_semaphore:
+        return fetcher(client, target_date)
+
+
+def _throttled_range_fetch(client: "Client", name: str, start: date, end: date) -> Dict[date, Dict[str, Any]]:
+    """Run a single fetch_stats_range call while holding the process-wide fetch semaphore."""
+    with _fetch_semaphore:
+        return fetch_stats_range(client, name, start, end)
+
+
+def fetch_days(client: "Client", dates: List[date]) -> Dict[date, Dict[str, Any]]:
+    """
+    Fetch every daily data source for the given dates concurrently.
+
+    Sources with a range endpoint are fetched once for the whole span;
+    if that request fails they fall back to per-day fetches.
+
+    Args:
+        client: Authenticated garth Client
+        dates: Dates to fetch
+
+    Returns:
+        Dict mapping each date to {source name: fetched data or None}
+    """
+    results: Dict[date, Dict[str, Any]] = {d: {} for d in dates}
+    if not dates:
+        return results
+    start, end = min(dates), max(dates)
+    ranged = [name for name in _RANGE_STATS if name in _DAILY_FETCHERS]
+
+    with ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as executor:
+        range_futures = {
+            executor.submit(_throttled_range_fetch, client, name, start, end): name
+            for name in ranged
+        }
+        futures = {
+            executor.submit(_throttled_fetch, fetcher, client, d): (d, name)
+            for d in dates
+            for name, fetcher in _DAILY_FETCHERS.items()
+            if name not in ranged
+        }
+        for future in as_completed(range_futures):
+            name = range_futures[future]
+            try:
+                by_date = future.result()
+            except Exception as e:
+                logger.warning("Error fetching %s for %s to %s, falling back to per-day: %s", name, start, end, e)
+                futures.update({
+                    executor.submit(_throttled_fetch, _DAILY_FETCHERS[name], client, d): (d, name)
+                    for d in dates
+                })
+                continue
+            for d in dates:
+                results[d][name] = by_date.get(d)
+
+        for future in as_completed(futures):
+            d, name = futures[future]
+            try:
+                results[d][name] = future.result()
+            except Exception as e:
+                logger.warning("Error fetching %s for %s: %s", name, d, e)
+                results[d][name] = None
+    return results
+
+
+# One sync per user at a time, so the scheduler and a manual sync don't both
+# refresh the same OAuth tokens and write the same days
+_sync_locks: Dict[int, threading.Lock] = {}
+_sync_locks_guard = threading.Lock()
+
+
+def _user_sync_lock(user_id: int) -> threading.Lock:
+    """Return the lock that serializes Garmin syncs for a user."""
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(user_id, threading.Lock())
+
+
+@contextmanager
+def _db_session(db_session=None):
+    """
+    Yield the caller's database session, or a new one that is closed afterwards.
+
+    Batch callers (e.g. the scheduler) should pass one shared session so each
+    user doesn't check out a fresh connection from the pool.
+
+    Args:
+        db_session: Optional database session owned by the caller
+    """
+    if db_session is not None:
+        yield db_session
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def refresh_garmin_data(
     user_id: int,
     days: int = 7,
-    db_session=None
+    db_session=None,
+    force: bool = False
 ) -> Dict[str, Any]:
     """
     Fetch and sync Garmin health metrics for a user.
 
+    Stored days older than yesterday (and synced at least a day after they
+    ended) are treated as complete and not fetched again unless force is set.
+    Concurrent syncs for the same user run one after another.
+
     Args:
         user_id: User ID
         days: Number of days to sync (default: 7)
         db_session: Optional database session (creates new if not provided)
+        force: Re-fetch every day in the window, even ones already stored
 
     Returns:
         Dictionary with sync results (success, count, errors)
     """
-    close_session = False
-    if db_session is None:
-        db = SessionLocal()
-        close_session = True
-    else:
-        db = db_session
-
-    try:
-        # Get user's Garmin connection
-        connection = db.query(GarminConnection).filter(
-            GarminConnection.user_id == user_id
-        ).first()
-
-        if not connection:
-            raise GarminAuthError("No Garmin connection found for user")
-
-        # Decrypt credentials
-        username = decrypt_token(connection.garmin_username)
-        password = decrypt_token(connection.garmin_password)
-        is_cn = connection.is_cn == 1
-
-        if not username or not password:
-            raise GarminAuthError("Invalid stored credentials")
-
-        # Try to use OAuth tokens first
-        client = Client()
-        if is_cn:
-            client.configure(domain="garmin.cn")
-
-        tokens_used = False
+    with _user_sync_lock(user_id), _db_session(db_session) as db:
+        try:
+            # Get user's Garmin connection
+            connection = db.query(GarminConnection).filter(
+                GarminConnection.user_id == user_id
+            ).first()
+
+            if not connection:
+                raise GarminAuthError("No Garmin connection found for user")
+
+            # Decrypt credentials
+            username = decrypt_token(connection.garmin_username)
+            password = decrypt_token(connection.garmin_password)
+            is_cn = connection.is_cn
+
+            if not username or not password:
+                raise GarminAuthError("Invalid stored credentials")
+
+            # Reuse a recently authenticated client, otherwise try OAuth tokens first
+            client = _get_cached_client(user_id)
+            tokens_used = client is not None
+            if tokens_used:
+                logger.info("Reusing cached Garmin client")
+            else:
+                client = _new_client(is_cn)
 
-        if connection.garmin_oauth_tokens:
-            try:
-                token_str = decrypt_token(connection.garmin_oauth_tokens)
-                if token_str and len(token_str) > 50:
-                    logger.info(f"Found stored OAuth tokens: {len(token_str)} chars")
-
-                    if deserialize_oauth_tokens(token_str, client):
-                        # Verify tokens by making an API call
-                        try:
-                            profile = client.connectapi("/userprofile-service/socialProfile")
-                            if profile:
-                                tokens_used = True
-                                logger.info("Stored OAuth tokens verified and working")
-                                # Update sync_status since tokens are valid
-                                connection.sync_status = "connected"
-                                connection.last_error = None
-                                db.commit()
-                            else:
-                                logger.warning("Token verification returned empty profile")
-                        except Exception as verify_err:
-                            logger.warning(f"Token verification failed: {verify_err}")
+            if not tokens_used and connection.garmin_oauth_tokens:
+                try:
+                    token_str = _decrypt_oauth_tokens(connection.garmin_oauth_tokens)
+                    if token_str and len(token_str) > 50:
+                        logger.info("Found stored OAuth tokens: %s chars", len(token_str))
+
+                        if deserialize_oauth_tokens(token_str, client):
+                            # Verify tokens by making an API call
+                            try:
+                                profile = client.connectapi("/userprofile-service/socialProfile")
+                                if profile:
+                                    tokens_used = True
+                                    if profile.get('id'):
+                                        _remember_profile_id(client, profile['id'])
+                                    logger.info("Stored OAuth tokens verified and working")
+                                    # Re-store tokens if garth refreshed them or they are in the legacy format.
+                                    # Commit right away so refreshed tokens survive a failed sync.
+                                    current_tokens = serialize_oauth_tokens(client)
+                                    if current_tokens and current_tokens != token_str:
+                                        connection.garmin_oauth_tokens = encrypt_token(current_tokens)
+                                        db.commit()
+                                else:
+                                    logger.warning("Token verification returned empty profile")
+                            except Exception as verify_err:
+                                logger.warning("Token verification failed: %s", verify_err)
+                                tokens_used = False
+                        else:
+                            logger.warning("Failed to deserialize OAuth tokens")
                             tokens_used = False
                     else:
-                        logger.warning("Failed to deserialize OAuth tokens")
+                        logger.warning("Stored OAuth tokens are empty or too short")
                         tokens_used = False
-                else:
-                    logger.warning("Stored OAuth tokens are empty or too short")
+                except Exception as e:
+                    logger.warning("Failed to load OAuth tokens: %s", e)
                     tokens_used = False
-            except Exception as e:
-                logger.warning(f"Failed to load OAuth tokens: {e}")
-                tokens_used = False
 
-        # Fall back to username/password login if tokens didn't work
-        if not tokens_used:
-            logger.info("No valid OAuth tokens, performing username/password login")
-            try:
-                client, user_info = login(username, password, is_cn=is_cn)
-
-                # Serialize and store the OAuth tokens
-                new_oauth_tokens = serialize_oauth_tokens(client)
-                if new_oauth_tokens:
-                    encrypted_tokens = encrypt_token(new_oauth_tokens)
-                    connection.garmin_oauth_tokens = encrypted_tokens
-                    connection.sync_status = "connected"
-                    connection.last_error = None
+            # Fall back to username/password login if tokens didn't work
+            if not tokens_used:
+                logger.info("No valid OAuth tokens, performing username/password login")
+                try:
+                    client, _ = login(username, password, is_cn=is_cn, fetch_profile=False)
+
+                    # Serialize and store the OAuth tokens
+                    new_oauth_tokens = serialize_oauth_tokens(client)
+                    if new_oauth_tokens:
+                        encrypted_tokens = encrypt_token(new_oauth_tokens)
+                        connection.garmin_oauth_tokens = encrypted_tokens
+                        connection.sync_status = "connected"
+                        connection.last_error = None
+                        db.commit()
+                        logger.info("Stored new OAuth tokens after successful login")
+                except Exception as e:
+                    connection.sync_status = "error"
+                    connection.last_error = str(e)
                     db.commit()
-                    logger.info("Stored new OAuth tokens after successful login")
-            except Exception as e:
-                connection.sync_status = "error"
-                connection.last_error = str(e)
-                db.commit()
-                raise GarminAuthError(f"Authentication failed: {str(e)}")
-
-        # Calculate date range and fetch data
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days - 1)
-
-        sync_results = {
-            'success': False,
-            'days_synced': 0,
-            'metrics_created': 0,
-            'metrics_updated': 0,
-            'activities_created': 0,
-            'errors': []
-        }
+                    raise GarminAuthError(f"Authentication failed: {str(e)}")
+
+            _cache_client(user_id, client)
+
+            # Per-day endpoints need the Garmin profile ID; reuse the stored one
+            # so a password login doesn't cost an extra socialProfile request
+            if connection.garmin_user_id:
+                _remember_profile_id(client, connection.garmin_user_id)
+
+            # Calculate date range and fetch data
+            end_date = date.today()
+            start_date = end_date - timedelta(days=days - 1)
+
+            sync_results = {
+                'success': False,
+                'days_synced': 0,
+                'metrics_created': 0,
+                'metrics_updated': 0,
+                'activities_created': 0,
+                'errors': []
+            }
 
-        current_date = start_date
-        while current_date <= end_date:
-            try:
-                logger.info(f"Fetching data for {current_date}")
-
-                daily_summary = fetch_daily_summary(client, current_date)
-                daily_wellness = fetch_daily_wellness(client, current_date)
-                daily_intensity = fetch_daily_intensity(client, current_date)
-                daily_body_battery = fetch_daily_body_battery(client, current_date)
-                daily_stress = fetch_daily_stress(client, current_date)
-                daily_steps = fetch_daily_steps(client, current_date)
-                daily_hrv = fetch_daily_hrv(client, current_date)
-                body_battery_events = fetch_body_battery_events(client, current_date)
-
-                if not daily_summary:
-                    logger.warning(f"No daily_summary data for {current_date}, skipping")
-                    current_date += timedelta(days=1)
-                    continue
-
-                metric_data = map_garmin_to_health_metric(
-                    user_id, daily_summary, current_date, daily_wellness, daily_intensity, daily_body_battery,
-                    daily_stress, daily_steps, daily_hrv
-                )
+            dates = [start_date + timedelta(days=i) for i in range(days)]
 
-                # Check if we have any data worth saving
-                has_data = any(
-                    v is not None
-                    for k, v in metric_data.items()
-                    if k not in ['user_id', 'date']
+            # Load which days are already stored for the whole window in one query
+            existing_dates = {
+                d for (d,) in db.query(HealthMetric.date).filter(
+                    HealthMetric.user_id == user_id,
+                    HealthMetric.date.in_(dates)
                 )
+            }
+            metric_rows = []
+
+            # A stored day is final once a sync ran at least a full day after it,
+            # so only top up today, yesterday and anything synced too early
+            if not force and connection.last_sync_at:
+                complete_before = min(end_date, connection.last_sync_at.date()) - timedelta(days=1)
+                skipped = [d for d in dates if d < complete_before and d in existing_dates]
+                if skipped:
+                    logger.info("Skipping %s already synced days", len(skipped))
+                    dates = [d for d in dates if d not in existing_dates or d >= complete_before]
+
+            logger.info("Fetching Garmin data for %s days from %s to %s", len(dates), start_date, end_date)
+            fetched = fetch_days(client, dates)
+
+            # Look up which fetched activities are already stored, for all days at once
+            stored_activity_ids = _stored_activity_ids(db, user_id, [
+                a.get('activityId')
+                for day in fetched.values()
+                for a in day['activities'] or ()
+                if a.get('activityId')
+            ])
+
+            # DB writes stay on this thread; the session is not thread-safe.
+            # The loop only adds rows and never reads them back, so don't autoflush
+            # pending activities before every per-day query.
+            with db.no_autoflush:
+                for current_date in dates:
+                    try:
+                        day = fetched[current_date]
+                        daily_summary = day['summary']
+                        body_battery_events = day['body_battery_events']
+
+                        if not daily_summary:
+                            logger.warning("No daily_summary data for %s, skipping", current_date)
+                            continue
+
+                        metric_data = map_garmin_to_health_metric(
+                            user_id, daily_summary, current_date, day['wellness'], day['intensity'],
+                            day['body_battery'], day['stress'], day['steps'], day['hrv']
+                        )
+
+                        # Check if we have any data worth saving
+                        has_data = any(metric_data[field] is not None for field in HEALTH_METRIC_FIELDS)
+
+                        if has_data:
+                            logger.info("Saving metric_data: %s", metric_data)
+                            metric_rows.append(metric_data)
+                            if current_date in existing_dates:
+                                sync_results['metrics_updated'] += 1
+                            else:
+                                sync_results['metrics_created'] += 1
+
+                            sync_results['days_synced'] += 1
+
+                        # Save body status timeseries data (regardless of has_data)
+                        save_body_status_timeseries(user_id, daily_summary, current_date, db, body_battery_events)
+
+                        # Save activities for this date
+                        activities = day['activities']
+                        if activities:
+                            activities_saved = save_garmin_activities(
+                                user_id, activities, current_date, db, stored_activity_ids
+                            )
+                            sync_results['activities_created'] += activities_saved
+                            logger.info("Saved %s activities for %s", activities_saved, current_date)
+
+                    except Exception as e:
+                        logger.error("Error processing data for %s: %s", current_date, e)
+                        sync_results['errors'].append(f"{current_date}: {str(e)}")
+
+            # Write metrics and update the connection in a single commit
+            synced_at = datetime.now(timezone.utc)
+            upsert_health_metrics(db, metric_rows, updated_at=synced_at)
+            connection.last_sync_at = synced_at
+            connection.sync_status = "connected"
+            profile_id = _cached_profile_id(client)
+            if not connection.garmin_user_id and profile_id:
+                connection.garmin_user_id = str(profile_id)
+            connection.last_error = None
+            db.commit()
+            invalidate_overview_cache()
 
-                if has_data:
-                    logger.info(f"Saving metric_data: {metric_data}")
-                    existing_metric = db.query(HealthMetric).filter(
-                        HealthMetric.user_id == user_id,
-                        HealthMetric.date == current_date
-                    ).first()
-
-                    if existing_metric:
-                        logger.info(f"Updating existing metric for {current_date}")
-                        for field, value in metric_data.items():
-                            if field not in ['user_id', 'date'] and value is not None:
-                                setattr(existing_metric, field, value)
-                        existing_metric.updated_at = datetime.now(timezone.utc)
-                        sync_results['metrics_updated'] += 1
-                    else:
-                        logger.info(f"Creating new metric for {current_date}")
-                        new_metric = HealthMetric(**metric_data)
-                        db.add(new_metric)
-                        sync_results['metrics_created'] += 1
-
-                    sync_results['days_synced'] += 1
-
-                # Save body status timeseries data (regardless of has_data)
-                if daily_summary:
-                    save_body_status_timeseries(user_id, daily_summary, current_date, db, body_battery_events)
-
-                # Fetch and save activities for this date
-                try:
-                    activities = fetch_daily_activities(client, current_date)
-                    if activities:
-                        activities_saved = save_garmin_activities(user_id, activities, current_date, db)
-                        sync_results['activities_created'] += activities_saved
-                        logger.info(f"Saved {activities_saved} activities for {current_date}")
-                except Exception as act_e:
-                    logger.warning(f"Error fetching activities for {current_date}: {act_e}")
+            sync_results['success'] = True
+            sync_results['last_sync_at'] = synced_at
+            return sync_results
 
-            except Exception as e:
-                logger.error(f"Error processing data for {current_date}: {e}")
-                sync_results['errors'].append(f"{current_date}: {str(e)}")
+        except Exception:
+            invalidate_garmin_client(user_id)
+            raise
 
-            current_date += timedelta(days=1)
 
-        # Commit changes and update connection
-        db.commit()
-        connection.last_sync_at = datetime.now(timezone.utc)
-        connection.sync_status = "connected"
-        connection.last_error = None
-        db.commit()
+def _encrypt_if_changed(plain: Optional[str], stored: Optional[str]) -> Optional[str]:
+    """
+    Encrypt a credential unless it matches the stored ciphertext's plaintext.
 
-        sync_results['success'] = True
-        sync_results['last_sync_at'] = datetime.now(timezone.utc)
-        return sync_results
+    Args:
+        plain: New plaintext value
+        stored: Currently stored ciphertext
 
-    finally:
-        if close_session:
-            db.close()
+    Returns:
+        New ciphertext, or None when there is nothing to update
+    """
+    if not plain or (stored and decrypt_token(stored) == plain):
+        return None
+    return encrypt_token(plain)
 
 
 def save_garmin_connection(
@@ -1315,7 +1733,7 @@ def save_garmin_connection(
     garmin_user_id: Optional[str] = None,
     garmin_display_name: Optional[str] = None,
     is_cn: bool = False,
-    client: Optional[Client] = None,
+    client: Optional["Client"] = None,
     db_session=None
 ) -> GarminConnection:
     """
@@ -1335,30 +1753,35 @@ def save_garmin_connection(
     Returns:
         GarminConnection object
     """
-    close_session = False
-    if db_session is None:
-        db = SessionLocal()
-        close_session = True
-    else:
-        db = db_session
+    # Stored credentials or region may change, so don't reuse an old client
+    invalidate_garmin_client(user_id)
 
-    try:
-        # Encrypt credentials
-        encrypted_username = encrypt_token(username) if username else None
-        encrypted_password = encrypt_token(password) if password else None
+    with _db_session(db_session) as db:
+        # Check for existing connection
+        existing = db.query(GarminConnection).filter(
+            GarminConnection.user_id == user_id
+        ).first()
 
-        # Serialize OAuth tokens if client is provided
+        # Encrypt credentials, leaving unchanged ones as stored
+        if existing:
+            encrypted_username = _encrypt_if_changed(username, existing.garmin_username)
+            encrypted_password = _encrypt_if_changed(password, existing.garmin_password)
+        else:
+            encrypted_username = encrypt_token(username) if username else None
+            encrypted_password = encrypt_token(password) if password else None
+
+        # Serialize OAuth tokens if client is provided; tokens that match the
+        # stored ones are left alone so the column isn't rewritten
         encrypted_oauth_tokens = None
         if client:
             oauth_tokens = serialize_oauth_tokens(client)
             if oauth_tokens:
-                encrypted_oauth_tokens = encrypt_token(oauth_tokens)
-                logger.info("Successfully serialized and encrypted OAuth tokens")
-
-        # Check for existing connection
-        existing = db.query(GarminConnection).filter(
-            GarminConnection.user_id == user_id
-        ).first()
+                if existing:
+                    encrypted_oauth_tokens = _encrypt_if_changed(oauth_tokens, existing.garmin_oauth_tokens)
+                else:
+                    encrypted_oauth_tokens = encrypt_token(oauth_tokens)
+                if encrypted_oauth_tokens:
+                    logger.info("Successfully serialized and encrypted OAuth tokens")
 
         if existing:
             # Update existing connection
@@ -1370,7 +1793,7 @@ def save_garmin_connection(
                 existing.garmin_oauth_tokens = encrypted_oauth_tokens
             existing.garmin_user_id = garmin_user_id or existing.garmin_user_id
             existing.garmin_display_name = garmin_display_name or existing.garmin_display_name
-            existing.is_cn = 1 if is_cn else 0
+            existing.is_cn = is_cn
             existing.updated_at = datetime.now(timezone.utc)
             existing.sync_status = "connected"
             existing.last_error = None
@@ -1390,7 +1813,7 @@ def save_garmin_connection(
                 garmin_mfa_token=None,
                 garmin_user_id=garmin_user_id,
                 garmin_display_name=garmin_display_name,
-                is_cn=1 if is_cn else 0,
+                is_cn=is_cn,
                 sync_status="connected"
             )
             db.add(connection)
@@ -1398,12 +1821,8 @@ def save_garmin_connection(
             db.refresh(connection)
             return connection
 
-    finally:
-        if close_session:
-            db.close()
-
 
-def resume_mfa_login(mfa_token: str, mfa_session_id: str) -> Tuple[Client, dict, bool, str, str]:
+def resume_mfa_login(mfa_token: str, mfa_session_id: str) -> Tuple["Client", dict, bool, str, str]:
     """
     Complete MFA login (second step without credentials).
 
@@ -1420,7 +1839,8 @@ def resume_mfa_login(mfa_token: str, mfa_session_id: str) -> Tuple[Client, dict,
     Raises:
         GarminAuthError: If MFA verification fails or session expires
     """
-    logger.info(f"Completing Garmin MFA login with session: {mfa_session_id[:16]}...")
+    from garth.sso import resume_login
+    logger.info("Completing Garmin MFA login with session: %s...", mfa_session_id[:16])
 
     # Retrieve the stored session with Client object
     session_data = get_mfa_session(mfa_session_id)
@@ -1444,13 +1864,13 @@ def resume_mfa_login(mfa_token: str, mfa_session_id: str) -> Tuple[Client, dict,
             "signin_params": signin_params
         }
 
-        logger.info(f"Calling resume_login with MFA code...")
+        logger.info("Calling resume_login with MFA code...")
         oauth1, oauth2 = resume_login(client_state, mfa_token)
 
         # Set tokens to our client
         client.oauth1_token = oauth1
         client.oauth2_token = oauth2
-        logger.info(f"Successfully authenticated using MFA")
+        logger.info("Successfully authenticated using MFA")
 
         # Clean up the session after successful login
         delete_mfa_session(mfa_session_id)
@@ -1462,27 +1882,16 @@ def resume_mfa_login(mfa_token: str, mfa_session_id: str) -> Tuple[Client, dict,
                 'garmin_user_id': str(profile.get('id')) if profile.get('id') else None,
                 'garmin_display_name': profile.get('displayName'),
             }
-            logger.info(f"User profile fetched: {user_info}")
+            logger.info("User profile fetched: %s", user_info)
         except Exception as e:
-            logger.warning(f"Failed to fetch user profile: {e}")
+            logger.warning("Failed to fetch user profile: %s", e)
             user_info = {'garmin_user_id': None, 'garmin_display_name': None}
 
         return client, user_info, is_cn, username, password
 
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"MFA login failed: {e}")
-
-        if "ticket" in error_msg.lower():
-            raise GarminAuthError(
-                "MFA verification failed. The code may have expired. "
-                "Please request a new verification code and try again."
-            )
-        if "invalid" in error_msg.lower() or "incorrect" in error_msg.lower():
-            raise GarminAuthError(
-                "Invalid verification code. Please check the code and try again."
-            )
-        raise GarminAuthError(f"MFA verification failed: {error_msg}")
+        logger.error("MFA login failed: %s", e)
+        raise _mfa_verification_error(str(e))
 
 
 def test_garmin_credentials(username: str, password: str, mfa_token: Optional[str] = None, is_cn: bool = False) -> bool:
@@ -1499,8 +1908,8 @@ def test_garmin_credentials(username: str, password: str, mfa_token: Optional[st
         True if credentials are valid, False otherwise
     """
     try:
-        client, user_info = login(username, password, mfa_token, is_cn)
+        client, _ = login(username, password, mfa_token, is_cn, fetch_profile=False)
         return client is not None
     except Exception as e:
-        logger.warning(f"Credentials test failed: {e}")
+        logger.warning("Credentials test failed: %s", e)
         return False
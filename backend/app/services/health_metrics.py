@@ -0,0 +1,56 @@
+"""
+Shared write helpers for HealthMetric rows, used by Garmin sync and data ingestion.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import HealthMetric
+
+# HealthMetric data columns (besides user_id/date) that an upsert may update
+HEALTH_METRIC_FIELDS = (
+    'sleep_hours', 'light_sleep_hours', 'deep_sleep_hours', 'rem_sleep_hours',
+    'resting_heart_rate', 'stress_level', 'exercise_minutes', 'steps', 'calories',
+    'distance_km', 'body_battery', 'body_battery_before_sleep', 'spo2',
+    'respiration_rate', 'resting_hr', 'sleep_score', 'hrv_last_night',
+    'hrv_weekly_avg', 'hrv_status',
+)
+
+# Rows per executemany call in upsert_health_metrics
+_UPSERT_BATCH = 1000
+
+
+def dialect_insert(db_session, model):
+    """Return an INSERT for the session's dialect that supports ON CONFLICT clauses."""
+    dialect = postgresql if db_session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+
+def upsert_health_metrics(
+    db_session,
+    rows: List[Dict[str, Any]],
+    updated_at: Optional[datetime] = None
+) -> None:
+    """
+    Insert or update HealthMetric rows in a single statement keyed on (user_id, date).
+
+    Non-null incoming values overwrite stored ones; None keeps the stored value.
+
+    Args:
+        db_session: Database session
+        rows: Metric dicts with user_id, date and any of HEALTH_METRIC_FIELDS
+        updated_at: Timestamp for updated rows (defaults to now)
+    """
+    if not rows:
+        return
+    stmt = dialect_insert(db_session, HealthMetric)
+    table = HealthMetric.__table__
+    set_ = {field: func.coalesce(stmt.excluded[field], table.c[field]) for field in HEALTH_METRIC_FIELDS}
+    set_['updated_at'] = updated_at or datetime.now(timezone.utc)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'date'], set_=set_)
+    # executemany in bounded chunks rather than one VALUES list, so long
+    # backfills stay well under the driver's bound-parameter limit
+    for i in range(0, len(rows), _UPSERT_BATCH):
+        db_session.execute(stmt, rows[i:i + _UPSERT_BATCH])
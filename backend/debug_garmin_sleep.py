@@ -2,8 +2,12 @@
 Debug script to inspect Garmin API raw data structure.
 This helps identify the correct field names for sleep data.
 """
+import argparse
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 # Add parent directory to path
@@ -12,17 +16,55 @@ sys.path.insert(0, os.path.dirname(__file__))
 from garminconnect import Garmin
 import json
 
-def debug_garmin_api():
+# Raw responses are cached on disk so repeated debugging runs skip the network
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.garmin_debug_cache')
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+def cached_call(endpoint, date_str, fetch, refresh=False):
+    """Return the cached response for (endpoint, date), calling fetch() on a miss."""
+    path = os.path.join(CACHE_DIR, f"{endpoint}_{date_str}.json")
+    if not refresh and os.path.exists(path) and time.time() - os.path.getmtime(path) < CACHE_TTL_SECONDS:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    data = fetch()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+
+def truncated_json(data, limit):
+    """Pretty-print data as JSON, encoding only as much as the first limit characters need."""
+    parts, size = [], 0
+    for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(data):
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return ''.join(parts)[:limit]
+
+
+def debug_garmin_api(refresh=False):
     """Debug Garmin API to see actual data structure returned."""
 
     # Get credentials from database
+    from sqlalchemy import select
     from app.core.database import SessionLocal
     from app.models import GarminConnection
     from app.core.security import decrypt_token
 
-    db = SessionLocal()
-    conn = db.query(GarminConnection).filter(GarminConnection.user_id == 1).first()
-    db.close()
+    # Only the credential columns are needed, so skip loading a full ORM object
+    with SessionLocal() as db:
+        conn = db.execute(
+            select(
+                GarminConnection.garmin_username,
+                GarminConnection.garmin_password,
+                GarminConnection.garmin_mfa_token,
+                GarminConnection.is_cn,
+            ).where(GarminConnection.user_id == 1)
+        ).first()
 
     if not conn:
         print("No Garmin connection found for user 1")
@@ -31,21 +73,33 @@ def debug_garmin_api():
     username = decrypt_token(conn.garmin_username)
     password = decrypt_token(conn.garmin_password)
     mfa_token = decrypt_token(conn.garmin_mfa_token) if conn.garmin_mfa_token else None
-    is_cn = conn.is_cn == 1
+    is_cn = bool(conn.is_cn)
 
     print(f"Connecting to {'Garmin China' if is_cn else 'Garmin International'}...")
     print(f"Username: {username[:3]}***")
 
-    try:
-        garmin = Garmin(username, password, is_cn=is_cn)
-        if mfa_token:
-            garmin.login_with_mfa(mfa_token)
-        else:
-            garmin.login()
-        print("Login successful!\n")
-    except Exception as e:
-        print(f"Login failed: {e}")
-        return
+    client = {}
+    login_lock = threading.Lock()
+
+    def garmin():
+        """Log in on first use, so runs served entirely from the cache skip it."""
+        with login_lock:
+            # Don't retry a failed login once per endpoint
+            if 'error' in client:
+                raise client['error']
+            if 'api' not in client:
+                try:
+                    api = Garmin(username, password, is_cn=is_cn)
+                    if mfa_token:
+                        api.login_with_mfa(mfa_token)
+                    else:
+                        api.login()
+                except Exception as e:
+                    client['error'] = e
+                    raise
+                print("Login successful!\n")
+                client['api'] = api
+        return client['api']
 
     target_date = date.today()
     date_str = target_date.strftime('%Y-%m-%d')
@@ -54,9 +108,26 @@ def debug_garmin_api():
     print(f"Fetching data for {date_str}")
     print("=" * 60)
 
+    # The endpoints are independent, so fetch them all at once
+    fetches = {
+        'user_summary': lambda: garmin().get_user_summary(date_str),
+        'sleep_data': lambda: garmin().get_sleep_data(date_str),
+        'sleep_summary': lambda: garmin().get_sleep_summary(date_str),
+        'daily_stats': lambda: garmin().get_daily_stats(date_str),
+    }
+    with ThreadPoolExecutor(max_workers=len(fetches)) as executor:
+        futures = {
+            name: executor.submit(cached_call, name, date_str, fetch, refresh)
+            for name, fetch in fetches.items()
+        }
+
     # 1. Get daily summary
     print("\n【1. Daily Summary - sleep related fields】")
-    summary = garmin.get_user_summary(date_str)
+    try:
+        summary = futures['user_summary'].result()
+    except Exception as e:
+        print(f"Login or fetch failed: {e}")
+        return
 
     sleep_fields = [k for k in summary.keys() if 'sleep' in k.lower() or 'Sleep' in k]
     print(f"Sleep-related keys in summary: {sleep_fields}")
@@ -74,7 +145,7 @@ def debug_garmin_api():
 
     # 2. Get sleep data
     print("\n【2. Sleep Data - full structure】")
-    sleep_data = garmin.get_sleep_data(date_str)
+    sleep_data = futures['sleep_data'].result()
 
     print(f"Top-level keys in sleep_data: {list(sleep_data.keys())}")
 
@@ -101,13 +172,13 @@ def debug_garmin_api():
 
     # Print full sleep_data for inspection (truncated)
     print("\n【Full sleep_data JSON (for inspection)】")
-    print(json.dumps(sleep_data, indent=2, ensure_ascii=False)[:3000] + "...")
+    print(truncated_json(sleep_data, 3000) + "...")
 
     # 3. Also check other potential endpoints
     print("\n【3. Checking other sleep endpoints】")
 
     try:
-        sleep_summary = garmin.get_sleep_summary(date_str)
+        sleep_summary = futures['sleep_summary'].result()
         print(f"get_sleep_summary keys: {list(sleep_summary.keys()) if isinstance(sleep_summary, dict) else 'not a dict'}")
         # Look for duration in sleep summary
         if isinstance(sleep_summary, dict):
@@ -119,7 +190,7 @@ def debug_garmin_api():
 
     try:
         # Check daily stats
-        daily = garmin.get_daily_stats(date_str)
+        daily = futures['daily_stats'].result()
         print(f"\nget_daily_stats keys: {list(daily.keys()) if isinstance(daily, dict) else 'not a dict'}")
         # Look for sleep in daily stats
         if isinstance(daily, dict):
@@ -130,4 +201,6 @@ def debug_garmin_api():
         print(f"  get_daily_stats failed: {e}")
 
 if __name__ == "__main__":
-    debug_garmin_api()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--refresh', action='store_true', help="ignore cached responses and refetch from Garmin")
+    debug_garmin_api(refresh=parser.parse_args().refresh)
@@ -2,11 +2,13 @@
 Sample data generator for FamilyLifeHub
 Creates test users and sample data for the last 30 days
 """
-import requests
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 import random
 import sys
 import io
+import threading
 
 # Fix UTF-8 encoding on Windows
 if sys.platform == 'win32':
@@ -17,10 +19,30 @@ if sys.platform == 'win32':
 API_URL = "http://localhost:8000"
 API_KEY = "your-secret-api-key-change-this-in-production"
 
-headers = {
-    "X-API-Key": API_KEY,
-    "Content-Type": "application/json"
-}
+# One keep-alive client for every request instead of a new connection per call.
+# httpx is already a backend dependency, so the script needs nothing extra.
+http_client = httpx.Client(
+    headers={
+        "X-API-Key": API_KEY,
+        "Content-Type": "application/json"
+    },
+    timeout=30.0
+)
+
+# Users are generated concurrently; keep their progress lines from interleaving
+_print_lock = threading.Lock()
+
+
+def log(message):
+    """Print a progress line from any worker thread."""
+    with _print_lock:
+        print(message)
+
+
+def for_each_user(users, generate, days):
+    """Run a generator function for every user concurrently."""
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        list(executor.map(lambda user: generate(user['id'], days=days), users))
 
 
 def create_users():
@@ -30,22 +52,25 @@ def create_users():
         {"name": "Bob", "avatar": None}
     ]
 
+    def post_user(user):
+        return http_client.post(f"{API_URL}/api/v1/users", json=user)
+
+    # Create both users at once; responses come back in input order
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        responses = list(executor.map(post_user, users))
+
     created_users = []
-    for user in users:
-        response = requests.post(
-            f"{API_URL}/api/v1/users",
-            json=user,
-            headers=headers
-        )
+    existing_users = None
+    for user, response in zip(users, responses):
         if response.status_code == 201:
             created_user = response.json()
             print(f"✓ Created user: {created_user['name']} (ID: {created_user['id']})")
             created_users.append(created_user)
         elif response.status_code == 400 and "already exists" in response.json().get("detail", ""):
-            # User already exists, fetch it
-            users_response = requests.get(f"{API_URL}/api/v1/users")
-            all_users = users_response.json()
-            existing_user = next((u for u in all_users if u['name'] == user['name']), None)
+            # User already exists; fetch the user list once for every conflict
+            if existing_users is None:
+                existing_users = http_client.get(f"{API_URL}/api/v1/users").json()
+            existing_user = next((u for u in existing_users if u['name'] == user['name']), None)
             if existing_user:
                 print(f"ℹ User already exists: {existing_user['name']} (ID: {existing_user['id']})")
                 created_users.append(existing_user)
@@ -55,13 +80,18 @@ def create_users():
     return created_users
 
 
+def day_strings(start_date, days):
+    """ISO date strings for the N days starting at start_date."""
+    return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+
 def generate_health_data(user_id, days=30):
     """Generate sample health metrics for the last N days."""
     end_date = date.today()
     start_date = end_date - timedelta(days=days - 1)
 
-    current_date = start_date
-    while current_date <= end_date:
+    records = []
+    for date_str in day_strings(start_date, days):
         # Generate realistic health data with some variation
         sleep_hours = round(random.uniform(6.0, 9.0), 1)
         light_sleep_hours = round(sleep_hours * random.uniform(0.5, 0.65), 1)
@@ -73,7 +103,7 @@ def generate_health_data(user_id, days=30):
 
         health_data = {
             "user_id": user_id,
-            "date": current_date.isoformat(),
+            "date": date_str,
             # Basic health metrics
             "sleep_hours": sleep_hours,
             "light_sleep_hours": light_sleep_hours,
@@ -92,19 +122,18 @@ def generate_health_data(user_id, days=30):
             "resting_hr": random.randint(50, 75),
             "sleep_score": sleep_score
         }
+        records.append(health_data)
 
-        response = requests.post(
-            f"{API_URL}/api/v1/ingest/health",
-            json=health_data,
-            headers=headers
-        )
+    # Send every day in one request instead of one POST per record
+    response = http_client.post(
+        f"{API_URL}/api/v1/ingest/health/bulk",
+        json=records
+    )
 
-        if response.status_code in [200, 201]:
-            print(f"✓ Added health data for user {user_id} on {current_date}")
-        else:
-            print(f"✗ Failed to add health data: {response.text}")
-
-        current_date += timedelta(days=1)
+    if response.status_code == 200:
+        log(f"✓ Added health data for user {user_id} from {start_date} to {end_date}")
+    else:
+        log(f"✗ Failed to add health data: {response.text}")
 
 
 def generate_work_data(user_id, days=30):
@@ -114,8 +143,8 @@ def generate_work_data(user_id, days=30):
 
     categories = ["coding", "browsing", "communication", "productivity"]
 
-    current_date = start_date
-    while current_date <= end_date:
+    added = failed = 0
+    for date_str in day_strings(start_date, days):
         # Generate 3-5 work sessions per day
         num_sessions = random.randint(3, 5)
 
@@ -126,45 +155,51 @@ def generate_work_data(user_id, days=30):
 
             work_data = {
                 "user_id": user_id,
-                "timestamp": f"{current_date.isoformat()}T{hour:02d}:{minute:02d}:00Z",
+                "timestamp": f"{date_str}T{hour:02d}:{minute:02d}:00Z",
                 "screen_time_minutes": random.randint(30, 120),
                 "focus_score": random.randint(50, 95),
                 "active_window_category": random.choice(categories)
             }
 
-            response = requests.post(
+            response = http_client.post(
                 f"{API_URL}/api/v1/ingest/work",
-                json=work_data,
-                headers=headers
+                json=work_data
             )
 
+            # Count results and report once per user rather than per record
             if response.status_code == 201:
-                print(f"✓ Added work data for user {user_id} on {current_date} at {hour:02d}:{minute:02d}")
+                added += 1
             else:
-                print(f"✗ Failed to add work data: {response.text}")
+                failed += 1
+                last_error = response.text
 
-        current_date += timedelta(days=1)
+    log(f"✓ Added {added} work records for user {user_id} from {start_date} to {end_date}")
+    if failed:
+        log(f"✗ Failed to add {failed} work records for user {user_id}: {last_error}")
 
 
 def main():
     """Main function to generate all sample data."""
+    try:
+        _generate()
+    finally:
+        http_client.close()
+
+
+def _generate():
+    """Create users and generate their health and work data."""
     print("=" * 60)
     print("FamilyLifeHub Sample Data Generator")
     print("=" * 60)
     print()
 
-    # Check if API is accessible
+    print("Step 1: Creating users...")
+    # The first POST doubles as the reachability check
     try:
-        response = requests.get(f"{API_URL}/health")
-        if response.status_code != 200:
-            print("✗ API is not accessible. Please start the backend first.")
-            return
-    except requests.exceptions.ConnectionError:
+        users = create_users()
+    except httpx.ConnectError:
         print("✗ Cannot connect to API. Please start the backend first.")
         return
-
-    print("Step 1: Creating users...")
-    users = create_users()
     print()
 
     if not users:
@@ -172,13 +207,11 @@ def main():
         return
 
     print("Step 2: Generating health data (last 30 days)...")
-    for user in users:
-        generate_health_data(user['id'], days=30)
+    for_each_user(users, generate_health_data, days=30)
     print()
 
     print("Step 3: Generating work data (last 30 days)...")
-    for user in users:
-        generate_work_data(user['id'], days=30)
+    for_each_user(users, generate_work_data, days=30)
     print()
 
     print("=" * 60)
@@ -4,34 +4,49 @@ FamilyLifeHub Backend - Main Application Entry Point
 A private family life data hub for tracking health and work metrics.
 """
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.core.config import settings
 from app.core.database import engine, Base
 from app.api.v1 import ingest, dashboard, users, auth, health, garmin, preferences, timeseries, reports, smtp_config, scheduler_logs, agent
+from migrations import migrate_all
 
-# Run database migrations before creating tables
-from migrations.add_sleep_stage_columns import migrate as migrate_sleep_stages
-from migrations.add_mail_for_notification import migrate as migrate_mail_notification
 
-print("Running database migrations...")
-migrate_sleep_stages()
-migrate_mail_notification()
-print("Migrations completed.")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database and start the scheduler before serving requests."""
+    # Run database migrations before creating tables
+    print("Running database migrations...")
+    migrate_all()
+    print("Migrations completed.")
+
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+
+    if settings.scheduler_enabled:
+        from app.tasks.scheduler import start_scheduler
+        logger.info("Scheduler started on application startup")
+        start_scheduler()
+
+    yield
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI application
 app = FastAPI(
     title=settings.app_name,
     description="Private family life data hub for health and work tracking",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan,
+    # orjson serializes the float-heavy metric payloads faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -43,6 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (trends, timeseries, reports)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Mount static files for uploads
 uploads_path = Path(__file__).parent / "uploads"
 uploads_path.mkdir(exist_ok=True)
@@ -63,18 +81,6 @@ app.include_router(scheduler_logs.router, prefix="/api/v1")
 app.include_router(agent.router, prefix="/api/v1")
 
 
-@app.on_event("startup")
-def startup_event():
-    """Initialize scheduler on application startup."""
-    if not settings.scheduler_enabled:
-        return
-
-
-    from app.tasks.scheduler import start_scheduler
-    logger.info("Scheduler started on application startup")
-    start_scheduler()
-
-
 @app.get("/")
 async def root():
     """Root endpoint - API health check."""
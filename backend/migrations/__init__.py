@@ -0,0 +1,74 @@
+"""
+Database migrations run at application startup.
+
+Each startup migration module exposes apply(cursor), which checks the live
+schema and makes any missing changes without committing. migrate_all() runs
+them on one SQLite connection inside a single transaction, and records
+SCHEMA_VERSION in the database so later startups skip them with one read.
+"""
+import os
+import sqlite3
+
+from app.core.config import settings
+from migrations import (
+    add_health_metric_unique_index,
+    add_mail_for_notification,
+    add_sleep_stage_columns,
+)
+
+# Applied in order by migrate_all()
+STARTUP_MIGRATIONS = (
+    add_sleep_stage_columns,
+    add_mail_for_notification,
+    add_health_metric_unique_index,
+)
+
+# Bump whenever a migration is added to STARTUP_MIGRATIONS
+SCHEMA_VERSION = 1
+
+
+def migrate_all() -> bool:
+    """
+    Apply every startup migration in a single transaction.
+
+    Returns:
+        True if any migration changed the schema
+
+    Raises:
+        Exception: Whatever a migration raised; all changes are rolled back
+    """
+    db_path = settings.database_path.replace("sqlite:///", "").replace("sqlite://", "")
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at: {db_path}, skipping migrations")
+        return False
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        (version,) = cursor.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return False
+
+        # DDL doesn't open a transaction implicitly in sqlite3, so start one.
+        # IMMEDIATE takes the write lock up front, so when several workers
+        # start together only one migrates; the rest see the new version.
+        cursor.execute("BEGIN IMMEDIATE")
+        (version,) = cursor.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            conn.rollback()
+            return False
+        changed = [migration.__name__ for migration in STARTUP_MIGRATIONS if migration.apply(cursor)]
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if changed:
+        print(f"Applied migrations: {', '.join(changed)}")
+    else:
+        print("Database schema is up to date. No migration needed.")
+    return bool(changed)
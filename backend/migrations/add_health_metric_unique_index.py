@@ -0,0 +1,82 @@
+"""
+Migration: Add unique (user_id, date) index to health_metrics table.
+
+Removes duplicate rows first, keeping the most recently inserted row for
+each user and date, so the Garmin sync can upsert on that key.
+"""
+import sqlite3
+from pathlib import Path
+
+
+def get_db_path() -> str:
+    """Get database path from environment or default."""
+    import os
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    data_dir = os.environ.get('DATA_DIR')
+    if data_dir:
+        return str(Path(data_dir) / 'family_life_hub.db')
+
+    # Default path
+    if os.name == 'nt':
+        base = os.environ.get('APPDATA', os.path.expanduser('~'))
+    else:
+        base = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return str(Path(base) / 'family_life_hub' / 'family_life_hub.db')
+
+
+def apply(cursor) -> bool:
+    """
+    Deduplicate health_metrics and create the index using the given cursor, without committing.
+
+    Args:
+        cursor: sqlite3 cursor on the application database
+
+    Returns:
+        True if the index was created
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='health_metrics'")
+    if not cursor.fetchone():
+        return False
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='uq_health_user_date'")
+    if cursor.fetchone():
+        return False
+
+    cursor.execute("""
+        DELETE FROM health_metrics
+        WHERE id NOT IN (SELECT MAX(id) FROM health_metrics GROUP BY user_id, date)
+    """)
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} duplicate health_metrics rows")
+
+    cursor.execute("CREATE UNIQUE INDEX uq_health_user_date ON health_metrics (user_id, date)")
+    print("Created index: uq_health_user_date")
+    return True
+
+
+def migrate():
+    """Deduplicate health_metrics and add the uq_health_user_date index."""
+    db_path = get_db_path()
+    print(f"Database path: {db_path}")
+
+    if not Path(db_path).exists():
+        print("Database file not found, skipping migration")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    if not apply(cursor):
+        print("Index uq_health_user_date already exists or table missing, skipping migration")
+        conn.close()
+        return
+
+    conn.commit()
+    conn.close()
+    print("Migration completed successfully")
+
+
+if __name__ == "__main__":
+    migrate()
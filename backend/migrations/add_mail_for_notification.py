@@ -23,6 +23,32 @@ def get_db_path() -> str:
     return str(Path(base) / 'family_life_hub' / 'family_life_hub.db')
 
 
+def apply(cursor) -> bool:
+    """
+    Add the mail_for_notification column using the given cursor, without committing.
+
+    Args:
+        cursor: sqlite3 cursor on the application database
+
+    Returns:
+        True if the column was added
+    """
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [col[1] for col in cursor.fetchall()]
+
+    if not columns or 'mail_for_notification' in columns:
+        return False
+
+    try:
+        cursor.execute("ALTER TABLE users ADD COLUMN mail_for_notification VARCHAR(255)")
+    except sqlite3.OperationalError as e:
+        if "duplicate column" in str(e).lower():
+            return False
+        raise
+    print("Added column: mail_for_notification")
+    return True
+
+
 def migrate():
     """Add mail_for_notification column to users table."""
     db_path = get_db_path()
@@ -35,26 +61,12 @@ def migrate():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    # Check if column already exists
-    cursor.execute("PRAGMA table_info(users)")
-    columns = [col[1] for col in cursor.fetchall()]
-
-    if 'mail_for_notification' in columns:
+    if not apply(cursor):
         print("Column mail_for_notification already exists, skipping migration")
         conn.close()
         return
 
-    # Add the column
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN mail_for_notification VARCHAR(255)")
-        print("Added column: mail_for_notification")
-        conn.commit()
-    except sqlite3.OperationalError as e:
-        if "duplicate column" in str(e).lower():
-            print("Column mail_for_notification already exists")
-        else:
-            raise
-
+    conn.commit()
     conn.close()
     print("Migration completed successfully")
 
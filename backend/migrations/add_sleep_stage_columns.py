@@ -13,6 +13,37 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.core.config import settings
 
 
+# Column definitions added to health_metrics when missing
+SLEEP_STAGE_COLUMNS = (
+    "light_sleep_hours FLOAT",
+    "deep_sleep_hours FLOAT",
+    "rem_sleep_hours FLOAT",
+)
+
+
+def apply(cursor) -> bool:
+    """
+    Add missing sleep stage columns using the given cursor, without committing.
+
+    Args:
+        cursor: sqlite3 cursor on the application database
+
+    Returns:
+        True if any column was added
+    """
+    cursor.execute("PRAGMA table_info(health_metrics)")
+    columns = {col[1] for col in cursor.fetchall()}
+    if not columns:
+        # Table not created yet; create_all() will add it with every column
+        return False
+
+    columns_to_add = [d for d in SLEEP_STAGE_COLUMNS if d.split()[0] not in columns]
+    for column_def in columns_to_add:
+        cursor.execute(f"ALTER TABLE health_metrics ADD COLUMN {column_def}")
+        print(f"Added column: {column_def}")
+    return bool(columns_to_add)
+
+
 def migrate():
     """Add missing columns to health_metrics table."""
     db_path = settings.database_path.replace("sqlite:///", "").replace("sqlite://", "")
@@ -25,28 +56,14 @@ def migrate():
     cursor = conn.cursor()
 
     try:
-        # Check if columns already exist
-        cursor.execute("PRAGMA table_info(health_metrics)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        columns_to_add = []
-        if "light_sleep_hours" not in columns:
-            columns_to_add.append("light_sleep_hours FLOAT")
-        if "deep_sleep_hours" not in columns:
-            columns_to_add.append("deep_sleep_hours FLOAT")
-        if "rem_sleep_hours" not in columns:
-            columns_to_add.append("rem_sleep_hours FLOAT")
-
-        if not columns_to_add:
+        # DDL doesn't open a transaction implicitly in sqlite3; start one so
+        # every added column is committed together
+        cursor.execute("BEGIN IMMEDIATE")
+        if not apply(cursor):
+            conn.rollback()
             print("Database schema is up to date. No migration needed.")
             return True
 
-        # Add missing columns
-        for column_def in columns_to_add:
-            sql = f"ALTER TABLE health_metrics ADD COLUMN {column_def}"
-            cursor.execute(sql)
-            print(f"Added column: {column_def}")
-
         conn.commit()
         print("Migration completed successfully!")
         return True
@@ -24,6 +24,10 @@ def migrate():
     cursor = conn.cursor()
 
     try:
+        # DDL doesn't open a transaction implicitly in sqlite3; start one so
+        # every added column is committed together
+        cursor.execute("BEGIN IMMEDIATE")
+
         # Check if columns already exist
         cursor.execute("PRAGMA table_info(strava_connections)")
         columns = [col[1] for col in cursor.fetchall()]
@@ -35,6 +39,7 @@ def migrate():
             columns_to_add.append("strava_client_secret TEXT")
 
         if not columns_to_add:
+            conn.rollback()
             print("Database schema is up to date. No migration needed.")
             return True
 
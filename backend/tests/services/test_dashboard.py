@@ -0,0 +1,127 @@
+"""
+Tests for dashboard service.
+"""
+import pytest
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import User, HealthMetric
+from app.services import dashboard
+from app.services.dashboard import (
+    get_daily_trends,
+    get_today_overview,
+    get_user_daily_trends,
+    get_user_overview,
+    invalidate_overview_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_overview_cache():
+    """Keep cached overview data from leaking between tests."""
+    invalidate_overview_cache()
+    yield
+    invalidate_overview_cache()
+
+
+@pytest.fixture
+def db_session():
+    """Create an in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def users(db_session):
+    """Create two users with a few days of health metrics."""
+    alice = User(name="Alice", email="alice@example.com", hashed_password="hashed")
+    bob = User(name="Bob", email="bob@example.com", hashed_password="hashed")
+    db_session.add_all([alice, bob])
+    db_session.commit()
+
+    db_session.add_all([
+        HealthMetric(user_id=alice.id, date=date(2026, 3, 1), sleep_hours=7.5, steps=8000),
+        HealthMetric(user_id=alice.id, date=date(2026, 3, 2), sleep_hours=6.0),
+        HealthMetric(user_id=bob.id, date=date(2026, 3, 2), sleep_hours=8.0, hrv_status="balanced"),
+    ])
+    db_session.commit()
+    return alice, bob
+
+
+class TestOverview:
+    """Test overview functions."""
+
+    def test_today_overview_returns_all_users(self, db_session, users):
+        """Should return one row per user, with None for missing metrics."""
+        alice, bob = users
+        result = get_today_overview(db_session, date(2026, 3, 1))
+
+        assert [m.user_id for m in result] == [alice.id, bob.id]
+        assert result[0].sleep_hours == 7.5
+        assert result[0].steps == 8000
+        assert result[1].sleep_hours is None
+
+    def test_user_overview_filters_by_user(self, db_session, users):
+        """Should only return the requested user."""
+        _, bob = users
+        result = get_user_overview(db_session, bob.id, date(2026, 3, 2))
+
+        assert len(result) == 1
+        assert result[0].user_name == "Bob"
+        assert result[0].hrv_status == "balanced"
+
+    def test_today_overview_is_cached_until_invalidated(self, db_session, users):
+        """Should serve cached rows until the cache is invalidated."""
+        alice, _ = users
+        assert get_today_overview(db_session, date(2026, 3, 1))[0].sleep_hours == 7.5
+
+        metric = db_session.query(HealthMetric).filter_by(user_id=alice.id, date=date(2026, 3, 1)).one()
+        metric.sleep_hours = 5.0
+        db_session.commit()
+        assert get_today_overview(db_session, date(2026, 3, 1))[0].sleep_hours == 7.5
+
+        invalidate_overview_cache()
+        assert get_today_overview(db_session, date(2026, 3, 1))[0].sleep_hours == 5.0
+
+    def test_overview_cache_is_bounded(self, db_session, users):
+        """Should keep at most the configured number of dates cached."""
+        for day in range(1, dashboard._OVERVIEW_CACHE_MAXSIZE + 11):
+            get_today_overview(db_session, date(2026, 1, 1) + timedelta(days=day))
+
+        assert len(dashboard._overview_cache) == dashboard._OVERVIEW_CACHE_MAXSIZE
+
+    def test_user_overview_unknown_user(self, db_session, users):
+        """Should return empty list for unknown user."""
+        assert get_user_overview(db_session, 999, date(2026, 3, 2)) == []
+
+
+class TestTrends:
+    """Test trend functions."""
+
+    def test_daily_trends_covers_every_user_and_day(self, db_session, users):
+        """Should emit a row per user per day ordered by date."""
+        result = get_daily_trends(db_session, date(2026, 3, 1), date(2026, 3, 3))
+
+        assert len(result) == 6
+        assert [t.date for t in result[:2]] == [date(2026, 3, 1)] * 2
+        assert result[3].sleep_hours == 8.0
+        assert result[5].sleep_hours is None
+
+    def test_user_daily_trends_filters_by_user(self, db_session, users):
+        """Should only return the requested user's rows."""
+        alice, _ = users
+        result = get_user_daily_trends(db_session, alice.id, date(2026, 3, 1), date(2026, 3, 2))
+
+        assert [t.sleep_hours for t in result] == [7.5, 6.0]
+        assert all(t.user_id == alice.id for t in result)
+
+    def test_user_daily_trends_unknown_user(self, db_session, users):
+        """Should return empty list for unknown user."""
+        assert get_user_daily_trends(db_session, 999, date(2026, 3, 1), date(2026, 3, 2)) == []
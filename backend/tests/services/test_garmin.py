@@ -0,0 +1,532 @@
+"""
+Tests for Garmin service helpers.
+"""
+import base64
+import pytest
+from dataclasses import replace
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
+
+from garth.auth_tokens import OAuth1Token, OAuth2Token
+from garth.http import Client
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.security import decrypt_token, encrypt_token
+from app.models import BodyStatusTimeseries, GarminActivity, GarminConnection, HealthMetric, User
+from app.services import garmin
+
+
+class TestFetchDays:
+    """Test concurrent per-day fetching."""
+
+    def test_collects_every_source_for_every_date(self, monkeypatch):
+        """Should return each fetcher's result keyed by date and source name."""
+        monkeypatch.setattr(garmin, '_RANGE_STATS', {})
+        monkeypatch.setattr(garmin, '_DAILY_FETCHERS', {
+            'summary': lambda client, d: {'day': d.day},
+            'steps': lambda client, d: d.isoformat(),
+        })
+        dates = [date(2026, 3, 1), date(2026, 3, 2)]
+
+        result = garmin.fetch_days(MagicMock(), dates)
+
+        assert result[date(2026, 3, 1)] == {'summary': {'day': 1}, 'steps': '2026-03-01'}
+        assert result[date(2026, 3, 2)] == {'summary': {'day': 2}, 'steps': '2026-03-02'}
+
+    def test_failed_fetch_becomes_none(self, monkeypatch):
+        """Should record None when a fetcher raises."""
+        def boom(client, d):
+            raise RuntimeError("network down")
+
+        monkeypatch.setattr(garmin, '_DAILY_FETCHERS', {'summary': boom})
+
+        result = garmin.fetch_days(MagicMock(), [date(2026, 3, 1)])
+
+        assert result == {date(2026, 3, 1): {'summary': None}}
+
+    def test_ranged_source_fetched_once(self, monkeypatch):
+        """Should fetch range-capable sources with one call for the whole span."""
+        calls = []
+
+        def fake_range(client, name, start, end):
+            calls.append((name, start, end))
+            return {date(2026, 3, 1): {'total_steps': 10}}
+
+        monkeypatch.setattr(garmin, 'fetch_stats_range', fake_range)
+        monkeypatch.setattr(garmin, '_DAILY_FETCHERS', {
+            'summary': lambda client, d: d.day,
+            'steps': lambda client, d: pytest.fail("per-day steps fetch should not run"),
+        })
+        dates = [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)]
+
+        result = garmin.fetch_days(MagicMock(), dates)
+
+        assert calls == [('steps', date(2026, 3, 1), date(2026, 3, 3))]
+        assert result[date(2026, 3, 1)] == {'summary': 1, 'steps': {'total_steps': 10}}
+        assert result[date(2026, 3, 2)]['steps'] is None
+
+    def test_range_failure_falls_back_to_per_day(self, monkeypatch):
+        """Should fetch a ranged source day by day when the range request fails."""
+        def boom(client, name, start, end):
+            raise RuntimeError("range endpoint down")
+
+        monkeypatch.setattr(garmin, 'fetch_stats_range', boom)
+        monkeypatch.setattr(garmin, '_DAILY_FETCHERS', {'steps': lambda client, d: d.day})
+
+        result = garmin.fetch_days(MagicMock(), [date(2026, 3, 1), date(2026, 3, 2)])
+
+        assert result == {date(2026, 3, 1): {'steps': 1}, date(2026, 3, 2): {'steps': 2}}
+
+    def test_profile_looked_up_once_per_client(self):
+        """Should fetch socialProfile once, not once per fetched day."""
+        client = MagicMock()
+        client.connectapi.side_effect = lambda path: {'id': 42} if 'socialProfile' in path else {'day': path}
+
+        garmin.fetch_daily_summary(client, date(2026, 3, 1))
+        garmin.fetch_daily_summary(client, date(2026, 3, 2))
+
+        profile_calls = [c for c in client.connectapi.call_args_list if 'socialProfile' in c.args[0]]
+        assert len(profile_calls) == 1
+        assert client.connectapi.call_args.args[0].endswith('/42?date=2026-03-02')
+
+
+class TestMfaSessions:
+    """Test the in-memory MFA session store."""
+
+    @pytest.fixture(autouse=True)
+    def clear_sessions(self):
+        """Keep sessions from leaking between tests."""
+        garmin._mfa_sessions.clear()
+        yield
+        garmin._mfa_sessions.clear()
+
+    def test_expired_sessions_are_dropped(self):
+        """Should drop sessions past the timeout and keep live ones."""
+        old_id = garmin.store_mfa_session(MagicMock(), {})
+        new_id = garmin.store_mfa_session(MagicMock(), {})
+        garmin._mfa_sessions[old_id]["created_at"] -= garmin._MFA_SESSION_TIMEOUT * 2
+
+        assert garmin.get_mfa_session(old_id) is None
+        assert garmin.get_mfa_session(new_id) is not None
+        assert list(garmin._mfa_sessions) == [new_id]
+
+    def test_delete_session(self):
+        """Should remove a stored session."""
+        session_id = garmin.store_mfa_session(MagicMock(), {}, username="user")
+        garmin.delete_mfa_session(session_id)
+
+        assert garmin.get_mfa_session(session_id) is None
+
+
+class TestMapGarminToHealthMetric:
+    """Test mapping of raw Garmin payloads to HealthMetric fields."""
+
+    @pytest.fixture
+    def sleep_payload(self):
+        """A dailySleepData response with the fields the mapper reads."""
+        return {
+            'dailySleepDTO': {
+                'sleepTimeSeconds': 27000,
+                'deepSleepSeconds': 5400,
+                'lightSleepSeconds': 14400,
+                'remSleepSeconds': 7200,
+                'sleepScores': {'overall': {'value': 82}},
+            },
+            'restingHeartRate': 54,
+            'sleepStress': [{'value': 10}, {'value': None}, {'value': 20}],
+            'sleepBodyBattery': [{'value': 30}, {'value': None}, {'value': 85}],
+            'wellnessSpO2SleepSummaryDTO': {'averageSpO2': 96},
+            'wellnessEpochRespirationDataDTOList': [
+                {'respirationValue': 14.0},
+                {'respirationValue': None},
+                {'respirationValue': 16.0},
+            ],
+        }
+
+    def test_maps_sleep_payload(self, sleep_payload):
+        """Should extract sleep, heart rate, stress, battery, SpO2 and respiration."""
+        metric = garmin.map_garmin_to_health_metric(1, sleep_payload, date(2026, 3, 1))
+
+        assert metric['user_id'] == 1
+        assert metric['date'] == date(2026, 3, 1)
+        assert metric['sleep_hours'] == 7.5
+        assert metric['deep_sleep_hours'] == 1.5
+        assert metric['light_sleep_hours'] == 4.0
+        assert metric['rem_sleep_hours'] == 2.0
+        assert metric['sleep_score'] == 82
+        assert metric['resting_hr'] == 54
+        assert metric['resting_heart_rate'] == 54
+        assert metric['stress_level'] == 15
+        assert metric['body_battery'] == 85
+        assert metric['body_battery_before_sleep'] == 30
+        assert metric['spo2'] == 96.0
+        assert metric['respiration_rate'] == 15.0
+        assert metric['steps'] is None
+        assert metric['hrv_status'] is None
+
+    def test_int_sleep_score_and_legacy_respiration(self):
+        """Should accept an int overall score and breathsPerMinute readings."""
+        payload = {
+            'dailySleepDTO': {'sleepScores': {'overall': 77}},
+            'respirationAveragesList': [{'BreathsPerMinute': 12}, {'breathsPerMinute': 18}],
+        }
+
+        metric = garmin.map_garmin_to_health_metric(1, payload, date(2026, 3, 1))
+
+        assert metric['sleep_score'] == 77
+        assert metric['respiration_rate'] == 15.0
+        assert metric['sleep_hours'] is None
+
+    def test_realtime_sources_take_precedence(self, sleep_payload):
+        """Should prefer real-time battery, stress and steps over sleep/wellness data."""
+        metric = garmin.map_garmin_to_health_metric(
+            1, sleep_payload, date(2026, 3, 1),
+            wellness_data={'totalSteps': 1000, 'totalDistanceMeters': 2500, 'totalKilocalories': 2100},
+            intensity_data={'total_minutes': 45},
+            body_battery_data={'current_body_battery': 60},
+            stress_data={'overall_stress_level': 33},
+            steps_data={'total_steps': 1200},
+            hrv_data={'last_night_avg': 48, 'weekly_avg': 50, 'status': 'BALANCED'},
+        )
+
+        assert metric['body_battery'] == 60
+        assert metric['body_battery_before_sleep'] is None
+        assert metric['stress_level'] == 33
+        assert metric['steps'] == 1200
+        assert metric['distance_km'] == 2.5
+        assert metric['calories'] == 2100
+        assert metric['exercise_minutes'] == 45
+        assert metric['hrv_last_night'] == 48
+        assert metric['hrv_weekly_avg'] == 50
+        assert metric['hrv_status'] == 'BALANCED'
+
+    def test_empty_payload(self):
+        """Should return all-None fields for an empty payload."""
+        metric = garmin.map_garmin_to_health_metric(1, {}, date(2026, 3, 1))
+
+        assert all(v is None for k, v in metric.items() if k not in ('user_id', 'date'))
+
+
+class TestParseGarminTime:
+    """Test Garmin timestamp parsing."""
+
+    @pytest.mark.parametrize("value, expected", [
+        ("2026-03-01 07:30:00", datetime(2026, 3, 1, 7, 30)),
+        ("2026-03-01T07:30:00.0", datetime(2026, 3, 1, 7, 30)),
+        ("2026-03-01T07:30:00Z", datetime(2026, 3, 1, 7, 30, tzinfo=timezone.utc)),
+        ("not a time", None),
+        (None, None),
+    ])
+    def test_parse(self, value, expected):
+        """Should parse Garmin's timestamp formats and return None otherwise."""
+        assert garmin.parse_garmin_time(value) == expected
+
+
+class TestOAuthTokenSerialization:
+    """Test OAuth token serialization round-trips."""
+
+    @pytest.fixture
+    def client(self):
+        """A garth Client holding fake OAuth tokens."""
+        client = Client()
+        client.configure(
+            oauth1_token=OAuth1Token(oauth_token="t1", oauth_token_secret="s1", domain="garmin.com"),
+            oauth2_token=OAuth2Token(
+                scope="s", jti="j", token_type="Bearer", access_token="a", refresh_token="r",
+                expires_in=3600, expires_at=9999999999,
+                refresh_token_expires_in=7200, refresh_token_expires_at=9999999999,
+            ),
+        )
+        return client
+
+    def test_round_trip(self, client):
+        """Should restore the same tokens into a fresh client."""
+        token_str = garmin.serialize_oauth_tokens(client)
+        restored = Client()
+
+        assert garmin.deserialize_oauth_tokens(token_str, restored) is True
+        assert restored.oauth1_token == client.oauth1_token
+        assert restored.oauth2_token == client.oauth2_token
+
+    def test_reserializes_after_token_change(self, client):
+        """Should not reuse the cached encoding once the client's tokens change."""
+        first = garmin.serialize_oauth_tokens(client)
+        assert garmin.serialize_oauth_tokens(client) == first
+
+        client.oauth2_token = replace(client.oauth2_token, access_token="b")
+        assert garmin.serialize_oauth_tokens(client) != first
+
+    def test_loads_legacy_double_base64_format(self, client):
+        """Should still load tokens stored with the old extra base64 layer."""
+        legacy = base64.b64encode(client.dumps().encode('utf-8')).decode('utf-8')
+        restored = Client()
+
+        assert garmin.deserialize_oauth_tokens(legacy, restored) is True
+        assert restored.oauth2_token == client.oauth2_token
+
+    def test_invalid_blob(self):
+        """Should return False for garbage input."""
+        assert garmin.deserialize_oauth_tokens("not-a-token", Client()) is False
+
+    def test_decrypted_tokens_cached_until_invalidated(self):
+        """Should memoize decrypted token blobs, but not failures, until credentials change."""
+        garmin.invalidate_garmin_client(1)
+        encrypted = encrypt_token("t" * 64)
+        assert garmin._decrypt_oauth_tokens(encrypted) == "t" * 64
+        assert garmin._decrypt_oauth_tokens.cache_info().currsize == 1
+
+        with pytest.raises(ValueError):
+            garmin._decrypt_oauth_tokens("not-a-ciphertext")
+        assert garmin._decrypt_oauth_tokens.cache_info().currsize == 1
+
+        garmin.invalidate_garmin_client(1)
+        assert garmin._decrypt_oauth_tokens.cache_info().currsize == 0
+
+
+class TestLoginErrors:
+    """Test classification of Garmin login failures."""
+
+    @pytest.fixture
+    def failing_login(self, monkeypatch):
+        """Make garth's SSO login raise the given message."""
+        def _fail(message):
+            def raise_error(*args, **kwargs):
+                raise RuntimeError(message)
+            monkeypatch.setattr('garth.sso.login', raise_error)
+            monkeypatch.setattr(garmin, '_new_client', lambda is_cn=False: MagicMock())
+        return _fail
+
+    @pytest.mark.parametrize("message, expected", [
+        ("401 Client Error: Unauthorized", "Invalid credentials"),
+        ("Please enter your verification code", "MFA_REQUIRED"),
+        ("Unauthorized: OTP required", "MFA_REQUIRED"),
+        ("MFA session expired", "MFA session expired"),
+        ("connection reset", "Login failed: connection reset"),
+    ])
+    def test_classifies_error_message(self, failing_login, message, expected):
+        """Should map garth error text to the matching GarminAuthError."""
+        failing_login(message)
+
+        with pytest.raises(Exception) as exc_info:
+            garmin.login("user@example.com", "secret")
+
+        assert str(exc_info.value) == expected
+
+    @pytest.mark.parametrize("message, expected", [
+        ("Invalid ticket", "The code may have expired"),
+        ("Incorrect code", "Invalid verification code"),
+        ("boom", "MFA verification failed: boom"),
+    ])
+    def test_mfa_verification_error(self, message, expected):
+        """Should map resume_login failures to user-facing messages."""
+        assert expected in str(garmin._mfa_verification_error(message))
+
+
+class TestRefreshGarminData:
+    """Test the sync loop against an in-memory database."""
+
+    @pytest.fixture
+    def db_session(self):
+        """Create an in-memory database session with a connected user."""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+
+        user = User(name="Test User", email="test@example.com", hashed_password="hashed")
+        session.add(user)
+        session.commit()
+        session.add(GarminConnection(
+            user_id=user.id,
+            garmin_username=encrypt_token("user@example.com"),
+            garmin_password=encrypt_token("secret"),
+            garmin_oauth_tokens=encrypt_token("x" * 64),
+            is_cn=False,
+        ))
+        session.commit()
+        yield session
+        session.close()
+
+    @pytest.fixture
+    def stub_garmin(self, monkeypatch):
+        """Stub out authentication and network fetches."""
+        garmin._client_cache.clear()
+        client = MagicMock()
+        client.connectapi.return_value = {'id': 42}
+        monkeypatch.setattr(garmin, '_new_client', lambda is_cn=False: client)
+        monkeypatch.setattr(garmin, 'deserialize_oauth_tokens', lambda token_str, c: True)
+        monkeypatch.setattr(garmin, 'serialize_oauth_tokens', lambda c: "")
+
+        sleep = {'value': 7.0}
+
+        def fake_fetch_days(c, dates):
+            return {
+                d: {
+                    'summary': {'dailySleepDTO': {'sleepTimeSeconds': sleep['value'] * 3600}},
+                    'wellness': None, 'intensity': None, 'body_battery': None, 'stress': None,
+                    'steps': {'total_steps': 1000 + d.day}, 'hrv': None,
+                    'body_battery_events': None, 'activities': [],
+                }
+                for d in dates
+            }
+
+        monkeypatch.setattr(garmin, 'fetch_days', fake_fetch_days)
+        yield sleep
+        garmin._client_cache.clear()
+
+    def test_creates_then_updates_metrics(self, db_session, stub_garmin):
+        """Should insert rows on first sync and update them on the next."""
+        user_id = db_session.query(User).one().id
+
+        first = garmin.refresh_garmin_data(user_id, days=3, db_session=db_session)
+        assert first['success'] is True
+        assert first['metrics_created'] == 3
+        assert first['metrics_updated'] == 0
+
+        stub_garmin['value'] = 8.0
+        second = garmin.refresh_garmin_data(user_id, days=3, db_session=db_session, force=True)
+        assert second['metrics_created'] == 0
+        assert second['metrics_updated'] == 3
+
+        metrics = db_session.query(HealthMetric).filter_by(user_id=user_id).all()
+        assert len(metrics) == 3
+        assert {m.sleep_hours for m in metrics} == {8.0}
+        assert all(m.steps == 1000 + m.date.day for m in metrics)
+        connection = db_session.query(GarminConnection).one()
+        assert connection.sync_status == "connected"
+        assert connection.last_sync_at is not None
+
+    def test_upsert_keeps_stored_value_when_new_is_none(self, db_session):
+        """Should only overwrite fields the incoming row actually has."""
+        user_id = db_session.query(User).one().id
+        row = garmin.map_garmin_to_health_metric(user_id, {}, date(2026, 3, 1))
+        garmin.upsert_health_metrics(db_session, [{**row, 'steps': 5000, 'sleep_hours': 7.0}])
+        garmin.upsert_health_metrics(db_session, [{**row, 'sleep_hours': 8.0}])
+        db_session.commit()
+
+        metric = db_session.query(HealthMetric).filter_by(user_id=user_id).one()
+        assert metric.steps == 5000
+        assert metric.sleep_hours == 8.0
+
+    def test_save_activities_skips_stored_ids(self, db_session):
+        """Should insert only activities not already stored."""
+        user_id = db_session.query(User).one().id
+        activities = [{'activityId': 1, 'activityName': 'Run'}, {'activityId': 2}, {'activityName': 'no id'}]
+
+        assert garmin.save_garmin_activities(user_id, activities, date(2026, 3, 1), db_session) == 2
+        db_session.commit()
+        activities.append({'activityId': 3})
+        assert garmin.save_garmin_activities(user_id, activities, date(2026, 3, 1), db_session) == 1
+
+    def test_sync_saves_new_activities_across_days(self, db_session, stub_garmin, monkeypatch):
+        """Should store each new activity once, skipping ones already saved."""
+        user_id = db_session.query(User).one().id
+        garmin.save_garmin_activities(user_id, [{'activityId': 1}], date.today(), db_session)
+        db_session.commit()
+
+        fetch_days = garmin.fetch_days
+
+        def with_activities(c, dates):
+            fetched = fetch_days(c, dates)
+            for d in dates:
+                fetched[d]['activities'] = [{'activityId': 1}, {'activityId': 100 + d.day}]
+            return fetched
+
+        monkeypatch.setattr(garmin, 'fetch_days', with_activities)
+        result = garmin.refresh_garmin_data(user_id, days=2, db_session=db_session)
+
+        assert result['activities_created'] == 2
+        assert db_session.query(GarminActivity).filter_by(user_id=user_id).count() == 3
+
+    def test_save_body_status_timeseries_replaces_day(self, db_session):
+        """Should store one row per timestamp and replace the day on re-sync."""
+        user_id = db_session.query(User).one().id
+        events = {
+            'body_battery_readings': [{'timestamp': 1772366400000, 'level': 50}],
+            'stress_readings': [{'timestamp': 1772366400000, 'stress_level': 20},
+                                {'timestamp': 1772366580000, 'stress_level': 25}],
+        }
+        target = datetime.utcfromtimestamp(1772366400).date()
+
+        assert garmin.save_body_status_timeseries(user_id, {}, target, db_session, events) == 2
+        assert garmin.save_body_status_timeseries(user_id, {}, target, db_session, events) == 2
+        db_session.commit()
+
+        rows = db_session.query(BodyStatusTimeseries).order_by(BodyStatusTimeseries.timestamp).all()
+        assert [(r.body_battery, r.stress_level) for r in rows] == [(50, 20), (None, 25)]
+
+    def test_save_connection_keeps_unchanged_credentials(self, db_session):
+        """Should only re-encrypt credentials that actually changed."""
+        user_id = db_session.query(User).one().id
+        before = db_session.query(GarminConnection).one()
+        stored_username, stored_password = before.garmin_username, before.garmin_password
+
+        connection = garmin.save_garmin_connection(
+            user_id, "user@example.com", "new-secret", db_session=db_session
+        )
+
+        assert connection.garmin_username == stored_username
+        assert connection.garmin_password != stored_password
+        assert decrypt_token(connection.garmin_password) == "new-secret"
+
+    def test_save_connection_keeps_unchanged_oauth_tokens(self, db_session, monkeypatch):
+        """Should not rewrite stored OAuth tokens when the client's tokens match."""
+        user_id = db_session.query(User).one().id
+        stored_tokens = db_session.query(GarminConnection).one().garmin_oauth_tokens
+        monkeypatch.setattr(garmin, 'serialize_oauth_tokens', lambda c: "x" * 64)
+
+        connection = garmin.save_garmin_connection(user_id, None, None, client=MagicMock(), db_session=db_session)
+        assert connection.garmin_oauth_tokens == stored_tokens
+
+        monkeypatch.setattr(garmin, 'serialize_oauth_tokens', lambda c: "y" * 64)
+        connection = garmin.save_garmin_connection(user_id, None, None, client=MagicMock(), db_session=db_session)
+        assert decrypt_token(connection.garmin_oauth_tokens) == "y" * 64
+
+    def test_skips_days_already_synced(self, db_session, stub_garmin):
+        """Should only re-fetch today and yesterday when older days are stored."""
+        user_id = db_session.query(User).one().id
+        garmin.refresh_garmin_data(user_id, days=3, db_session=db_session)
+
+        stub_garmin['value'] = 8.0
+        result = garmin.refresh_garmin_data(user_id, days=3, db_session=db_session)
+
+        assert result['metrics_updated'] == 2
+        metrics = db_session.query(HealthMetric).filter_by(user_id=user_id).order_by(HealthMetric.date).all()
+        assert [m.sleep_hours for m in metrics] == [7.0, 8.0, 8.0]
+
+    def test_profile_id_persisted_and_reused(self, db_session, stub_garmin, monkeypatch):
+        """Should store the verified profile ID and seed password logins with it."""
+        user_id = db_session.query(User).one().id
+        garmin.refresh_garmin_data(user_id, days=1, db_session=db_session)
+
+        connection = db_session.query(GarminConnection).one()
+        assert connection.garmin_user_id == "42"
+
+        garmin.invalidate_garmin_client(user_id)
+        connection.garmin_user_id = "7"
+        db_session.commit()
+        login_client = MagicMock()
+        monkeypatch.setattr(garmin, 'deserialize_oauth_tokens', lambda token_str, c: False)
+        monkeypatch.setattr(garmin, 'login', lambda *args, **kwargs: (login_client, {}))
+
+        garmin.refresh_garmin_data(user_id, days=1, db_session=db_session)
+
+        assert garmin._profile_ids[login_client] == "7"
+        login_client.connectapi.assert_not_called()
+
+    def test_reuses_cached_client(self, db_session, stub_garmin, monkeypatch):
+        """Should skip token verification when a cached client is available."""
+        user_id = db_session.query(User).one().id
+        garmin.refresh_garmin_data(user_id, days=1, db_session=db_session)
+        assert user_id in garmin._client_cache
+
+        def fail_deserialize(token_str, c):
+            raise AssertionError("tokens should not be reloaded")
+
+        monkeypatch.setattr(garmin, 'deserialize_oauth_tokens', fail_deserialize)
+        assert garmin.refresh_garmin_data(user_id, days=1, db_session=db_session)['success'] is True
+
+        garmin.invalidate_garmin_client(user_id)
+        assert user_id not in garmin._client_cache